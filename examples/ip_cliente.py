@@ -22,7 +22,7 @@ LOCAL_TZ = timezone('Europe/Madrid')
 
 def run_example(ip, port, der, dir_pm, clave_pm):
     try:
-        physical_layer = iec870ree.ip.Ip((ip, port))
+        physical_layer = iec870ree.ip.Ip((ip, port), waiting=0)
         link_layer = iec870ree.protocol.LinkLayer(der, dir_pm)
         link_layer.initialize(physical_layer)
         app_layer = iec870ree.protocol.AppLayer()
@@ -30,7 +30,7 @@ def run_example(ip, port, der, dir_pm, clave_pm):
         app_layer.initialize(link_layer)
 
         physical_layer.connect()
-        link_layer.link_state_request()
+        link_layer.wait_ready()
         link_layer.remote_link_reposition()
         logging.info("before authentication")
         resp = app_layer.authenticate(clave_pm)
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 import bitstring
 import struct
+import calendar
 import datetime
+import threading
 from pytz import timezone
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 try:
     from collections import Iterable
 except:
@@ -11,8 +13,10 @@ except:
     collections.Iterable = collections.abc.Iterable
 
 from six import with_metaclass
+from .dst import get_table
 
 TIMEZONE = timezone('Europe/Madrid')
+TIMEZONE_TABLE = get_table(TIMEZONE)
 
 __all__ = [
     'C_AC_NA_2',
@@ -64,6 +68,8 @@ IntegratedTotals = namedtuple('IntegratedTotals', ['address', 'total', 'quality'
 
 SingleEvent = namedtuple('SingleEvent', ['SPA', 'SPQ', 'SPI', 'date'])
 
+EventRecord = namedtuple('EventRecord', ['SPA', 'SPQ', 'SPI', 'epoch_ms'])
+
 ContractedPower = namedtuple('ContractedPower', ['address', 'power'])
 
 SerialPortConf = namedtuple('SerialPortConf', ['speed', 'params', 'start_mode', 'start_string'])
@@ -208,8 +214,31 @@ REGISTRADOR_RM2_OBJECTS = {
 }
 
 
+def object_classes(objects):
+    """Extension object classes indexed by object id, None for the unknown
+    ids or the objects without class"""
+    classes = [None] * 256
+    for object_id, description in objects.items():
+        classes[object_id] = globals().get(description['object'])
+    return classes
+
+
+def iter_records(record, data, count, offset=0):
+    """Unpacks count consecutive record structs from data at offset"""
+    view = memoryview(data)[offset:offset + count * record.size]
+    if hasattr(record, 'iter_unpack'):
+        return record.iter_unpack(view)
+    return (record.unpack_from(view, position)
+            for position in range(0, len(view), record.size))
+
+
 class AppAsduRegistry(type):
     types = dict()
+    # decoder(data, cualificador_ev) -> app ASDU, indexed by type byte. The
+    # table only dispatches, the record layouts are the Struct attributes
+    # of each class (M_IT_TX_2.RECORD, M_TA_VX_2.RECORD, M_SP_TA_2.EVENT,
+    # M_IB_TK_2.BLOCKS)
+    decoders = [None] * 256
 
     def __new__(meta, name, bases, class_dict):
         cls = type.__new__(meta, name, bases, class_dict)
@@ -221,6 +250,26 @@ class AppAsduRegistry(type):
         if cls.__name__ == 'BaseAppAsdu':
             return
         AppAsduRegistry.types[cls.type] = cls
+        AppAsduRegistry.decoders[cls.type] = cls.decode
+
+    @staticmethod
+    def register_decoder(asdu_type, decoder):
+        """Replaces the decoder of an ASDU type, for example with an
+        optimized or vendor specific one. Only the dispatch is replaced,
+        the decoder reads the records with its own layout.
+
+        :param decoder: callable(data, cualificador_ev) returning the
+            decoded app ASDU
+        """
+        AppAsduRegistry.decoders[asdu_type] = decoder
+
+    @staticmethod
+    def decode_asdu(asdu_type, data, cualificador_ev):
+        """Decodes the data of an ASDU, KeyError if type is unknown"""
+        decoder = AppAsduRegistry.decoders[asdu_type]
+        if decoder is None:
+            raise KeyError(asdu_type)
+        return decoder(data, cualificador_ev)
 
 
 class BaseAppAsdu(with_metaclass(AppAsduRegistry)):
@@ -228,6 +277,14 @@ class BaseAppAsdu(with_metaclass(AppAsduRegistry)):
     data_length = 0
     type = 0
 
+    __slots__ = ()
+
+    @classmethod
+    def decode(cls, data, cualificador_ev):
+        content = cls()
+        content.from_hex(data, cualificador_ev)
+        return content
+
     @property
     def length(self):
         return self.data_length + 0x09
@@ -235,8 +292,20 @@ class BaseAppAsdu(with_metaclass(AppAsduRegistry)):
     @property
     def values(self):
         return "\n".join([
-            "    {}: {}".format(k, v) for k,v in vars(self).items()
+            "    {}: {}".format(k, v) for k, v in self.fields()
         ])
+
+    def fields(self):
+        """(name, value) of the instance attributes, slots included"""
+        names = []
+        for cls in reversed(type(self).__mro__):
+            names.extend(getattr(cls, '__slots__', ()))
+        fields = [
+            (name, getattr(self, name)) for name in names
+            if hasattr(self, name)
+        ]
+        fields.extend(getattr(self, '__dict__', {}).items())
+        return fields
     
     def __repr__(self):
         return '\n'.join([
@@ -274,8 +343,7 @@ class M_TI_TA_2(BaseAppAsdu):
         self.tiempo = None
 
     def from_hex(self, data, cualificador_ev):
-        self.tiempo = TimeB()
-        self.tiempo.from_hex(data)
+        self.tiempo = TimeB.decode(data)
 
 
 class C_CS_TA_2(BaseAppAsdu):
@@ -290,12 +358,11 @@ class C_CS_TA_2(BaseAppAsdu):
         if sincrotime is None:
             sincrotime = datetime.datetime.now()
         if sincrotime and not sincrotime.tzinfo:
-            TIMEZONE.localize(sincrotime)
+            TIMEZONE_TABLE.localize(sincrotime)
         self.tiempo = TimeB(sincrotime)
 
     def from_hex(self, data, cualificador_ev):
-        self.tiempo = TimeB()
-        self.tiempo.from_hex(data)
+        self.tiempo = TimeB.decode(data)
 
     def to_bytes(self):
         response = bytearray()
@@ -336,8 +403,8 @@ class C_SP_NB_2(BaseAppAsdu):
         if date_to is None:
             date_to = datetime.datetime.now()
 
-        self.date_from = TimeA(TIMEZONE.localize(date_from))
-        self.date_to = TimeA(TIMEZONE.localize(date_to))
+        self.date_from = TimeA(TIMEZONE_TABLE.localize(date_from))
+        self.date_to = TimeA(TIMEZONE_TABLE.localize(date_to))
 
     def to_bytes(self):
         response = bytearray()
@@ -347,10 +414,8 @@ class C_SP_NB_2(BaseAppAsdu):
         return response
 
     def from_hex(self, data, cualificador_ev):
-        self.date_from = TimeA()
-        self.date_from.from_hex(data[0:5])
-        self.date_to = TimeA()
-        self.date_to.from_hex(data[5:10])
+        self.date_from = TimeA.decode(data)
+        self.date_to = TimeA.decode(data, 5)
 
 
 class M_SP_TA_2(BaseAppAsdu):
@@ -360,21 +425,40 @@ class M_SP_TA_2(BaseAppAsdu):
     type = 1
     causa_tm = 5
 
+    # SPA, SPQ + SPI, TimeB milliseconds + seconds and CP40 octets
+    EVENT = struct.Struct("<BBH5B")
+
+    __slots__ = ('valores',)
+
     def __init__(self):
         self.valores = []
 
     def to_bytes(self):
         return bytes()
 
+    @staticmethod
+    def decode_records(data, cualificador_ev):
+        """Decodes the events as EventRecord, with the date as UTC epoch
+        milliseconds instead of a TimeB"""
+        records = []
+        for (SPA, SPQI, milliseconds, minute, hour, day, month,
+             year) in iter_records(M_SP_TA_2.EVENT, data, cualificador_ev):
+            epoch = cp40_octets_epoch((minute, hour, day, month, year))
+            records.append(EventRecord(
+                SPA, (SPQI & 0xF7) >> 1, SPQI & 0x01,
+                (epoch + (milliseconds >> 10)) * 1000
+                + (milliseconds & 0x3ff)
+            ))
+        return records
+
     def from_hex(self, data, cualificador_ev):
         for i in range(0, cualificador_ev):
             position = i * 9
-            SPA = struct.unpack("B", data[position:position+1])[0]
-            SPQI = struct.unpack("B", data[position+1:position+2])[0]
+            SPA = struct.unpack_from("B", data, position)[0]
+            SPQI = struct.unpack_from("B", data, position+1)[0]
             SPQ = (SPQI & 0xF7) >> 1
             SPI = (SPQI & 0x01)
-            tiempo = TimeB()
-            tiempo.from_hex(data[position+2:position+10])
+            tiempo = TimeB.decode(data, position+2)
             self.valores.append(SingleEvent(SPA, SPQ, SPI, tiempo))
 
 
@@ -394,10 +478,10 @@ class P_MP_NA_2(BaseAppAsdu):
         return bytes()
 
     def from_hex(self, data, cualificador_ev):
-        std_date = struct.unpack("B", data[0:1])[0]
+        std_date = struct.unpack_from("B", data, 0)[0]
         self.ano_standard = '{}/{}'.format(std_date & 15, ((std_date & 240) >> 4) + 2000)
-        self.codigo_fabricante = struct.unpack("B", data[1:2])[0]
-        self.codigo_equipo = struct.unpack("I", data[2:6])[0]
+        self.codigo_fabricante = struct.unpack_from("B", data, 1)[0]
+        self.codigo_equipo = struct.unpack_from("I", data, 2)[0]
 
 
 class C_AC_NA_2(BaseAppAsdu):
@@ -458,10 +542,10 @@ class C_CI_NX_2(BaseAppAsdu):
         self.tiempo_final = TimeA(end_date)
 
     def from_hex(self, data, cualificador_ev):
-        self.primer_integrado = struct.unpack("B", data[0:1])[0]
-        self.ultimo_integrado = struct.unpack("B", data[1:2])[0]
-        self.tiempo_inicial.from_hex(data[2:7])
-        self.tiempo_final.from_hex(data[7:12])
+        self.primer_integrado = struct.unpack_from("B", data, 0)[0]
+        self.ultimo_integrado = struct.unpack_from("B", data, 1)[0]
+        self.tiempo_inicial.from_hex(data, 2)
+        self.tiempo_final.from_hex(data, 7)
 
     def to_bytes(self):
         response = bytearray()
@@ -526,8 +610,8 @@ class C_TA_VM_2(BaseAppAsdu):
         self.end_date = TimeA(end_date)
 
     def from_hex(self, data, cualificador_ev):
-        self.start_date.from_hex(data[0:5])
-        self.end_date.from_hex(data[5:10])
+        self.start_date.from_hex(data)
+        self.end_date.from_hex(data, 5)
 
     def to_bytes(self):
         response = bytearray()
@@ -547,52 +631,39 @@ class M_TA_VX_2(BaseAppAsdu):
     data_length = 0x06
     causa_tm = 5
 
+    # billing record of a contract, 63 bytes
+    RECORD = struct.Struct(
+        "<B"
+        "IIB"  # active energy absolute, incremental and quality
+        "IIB"  # inductive reactive energy
+        "IIB"  # capacitive reactive energy
+        "IB"  # reserved 7
+        "IB"  # reserved 8
+        "I5BB"  # maximum power, its date (TimeA) and quality
+        "IB"  # excess power and quality
+        "5B5B"  # period start and end dates (TimeA)
+    )
+
+    __slots__ = ('valores',)
+
     def __init__(self):
         self.valores = []
 
     def from_hex(self, data, cualificador_ev):
-        address = struct.unpack("B", data[0:1])[0]
-        # Active energy
-        active_abs = struct.unpack("I", data[1:5])[0]
-        active_inc = struct.unpack("I", data[5:9])[0]
-        active_qual = struct.unpack("B", data[9:10])[0]
-        # Inductive reactive energy
-        reactive_abs_ind = struct.unpack("I", data[10:14])[0]
-        reactive_inc_ind = struct.unpack("I", data[14:18])[0]
-        reactive_qua_ind = struct.unpack("B", data[18:19])[0]
-        # Absolute reactive energy
-        reactive_abs_cap = struct.unpack("I", data[19:23])[0]
-        reactive_inc_cap = struct.unpack("I", data[23:27])[0]
-        reactive_qual_cap = struct.unpack("B", data[27:28])[0]
-        # Reserved 7
-        reserved_7 = struct.unpack("I", data[28:32])[0]
-        reserved_7_qual = struct.unpack("B", data[32:33])[0]
-        # Reserved 8
-        reserved_8 = struct.unpack("I", data[33:37])[0]
-        reserved_8_qual = struct.unpack("B", data[37:38])[0]
-        # Maximum power
-        max_power = struct.unpack("I", data[38:42])[0]
-        max_power_date = TimeA()
-        max_power_date.from_hex(data[42:47])
-        max_power_qual = struct.unpack("B", data[47:48])[0]
-        # Excessive power
-        excess_power = struct.unpack("I", data[48:52])[0]
-        ecxess_power_qual = struct.unpack("B", data[52:53])[0]
-        # Period start date
-        date_start = TimeA()
-        date_start.from_hex(data[53:58])
-        # Period end date
-        date_end = TimeA()
-        date_end.from_hex(data[58:63])
-
-        br = BillingRegister(address, active_abs, active_inc, active_qual,
-        reactive_abs_ind, reactive_inc_ind, reactive_qua_ind, reactive_abs_cap,
-        reactive_inc_cap, reactive_qual_cap, reserved_7, reserved_7_qual,
-        reserved_8, reserved_8_qual, max_power, max_power_date.datetime,
-        max_power_qual, excess_power, ecxess_power_qual, date_start.datetime,
-        date_end.datetime)
-
-        self.valores.append(br)
+        # one record by contract
+        if len(data) < cualificador_ev * M_TA_VX_2.RECORD.size:
+            raise ValueError(
+                "{} billing records don't fit in {} bytes".format(
+                    cualificador_ev, len(data))
+            )
+        for values in iter_records(M_TA_VX_2.RECORD, data, cualificador_ev):
+            self.valores.append(BillingRegister(*(
+                values[:15]
+                + (cp40_octets_datetime(values[15:20]), )
+                + values[20:23]
+                + (cp40_octets_datetime(values[23:28]),
+                   cp40_octets_datetime(values[28:33]))
+            )))
 
 
 class M_TA_VC_2(M_TA_VX_2):
@@ -601,6 +672,8 @@ class M_TA_VC_2(M_TA_VX_2):
     """
     type = 135
 
+    __slots__ = ()
+
 
 class M_TA_VM_2(M_TA_VX_2):
     """
@@ -608,30 +681,36 @@ class M_TA_VM_2(M_TA_VX_2):
     """
     type = 136
 
+    __slots__ = ()
+
 
 class M_IT_TX_2(BaseAppAsdu):
     """
     Class for the M_IT_TG_2(8) and M_IT_TK_2(11) ASDUs
     """
 
+    # 1 byte de typo 4 de medida 1 de cualificador
+    # total integrado (4 octetos de energía+1 octeto con cualificadores
+    # y número de secuencia), para cada uno de los totales.
+    RECORD = struct.Struct("<BIB")
+
+    __slots__ = ('valores', 'tiempo')
+
     def __init__(self):
         self.valores = []
         self.tiempo = None
 
     def from_hex(self, data, cualificador_ev):
-        time_pos = cualificador_ev * 6
-        self.tiempo = TimeA()
-        self.tiempo.from_hex(data[time_pos:time_pos + 5])
-        for i in range(0, cualificador_ev):
-            position = i * 6  # 1 byte de typo 4 de medida 1 de cualificador
-            # total integrado (4 octetos de energía+1 octeto con cualificadores
-            # y número de secuencia), para cada uno de los totales.
-            address = struct.unpack("B", data[position:position + 1])[0]
-            total = struct.unpack("I",
-                                  data[position + 1:position + 5])[0]
-            quality = struct.unpack("B", data[position + 5:position + 6])[0]
-            self.valores.append(IntegratedTotals(address, total, quality,
-                                                 self.tiempo.datetime))
+        time_pos = cualificador_ev * M_IT_TX_2.RECORD.size
+        self.tiempo = TimeA.decode(data, time_pos)
+        # all the totals share the time of the frame
+        fecha = cp40_datetime(data, time_pos)
+        self.valores.extend([
+            IntegratedTotals(address, total, quality, fecha)
+            for address, total, quality in iter_records(
+                M_IT_TX_2.RECORD, data, cualificador_ev
+            )
+        ])
 
 
 class M_IT_TK_2(M_IT_TX_2):
@@ -642,6 +721,8 @@ class M_IT_TK_2(M_IT_TX_2):
 
     type = 11
 
+    __slots__ = ()
+
 
 class M_IT_TG_2(M_IT_TX_2):
     """
@@ -651,6 +732,8 @@ class M_IT_TG_2(M_IT_TX_2):
 
     type = 8
 
+    __slots__ = ()
+
 
 class C_CB_UN_2(BaseAppAsdu):
     """
@@ -673,9 +756,9 @@ class C_CB_UN_2(BaseAppAsdu):
         self.object = adr_object
 
     def from_hex(self, data, cualificador_ev):
-        self.object = struct.unpack("B", data[0:1])[0]
-        self.start_date.from_hex(data[1:6])
-        self.end_date.from_hex(data[6:11])
+        self.object = struct.unpack_from("B", data, 0)[0]
+        self.start_date.from_hex(data, 1)
+        self.end_date.from_hex(data, 6)
 
     def to_bytes(self):
         response = bytearray()
@@ -696,34 +779,41 @@ class M_IB_TK_2(BaseAppAsdu):
     """
     type = 140
 
+    # number of totals in a block for each object address
+    TOTALS = {
+        9: 8,
+        10: 6,
+        11: 3
+    }
+    # object address and (total, quality) for each total, a TimeA follows
+    BLOCKS = dict(
+        (address, struct.Struct("<B" + "IB" * amount))
+        for address, amount in TOTALS.items()
+    )
+
+    __slots__ = ('valores', 'tiempo')
+
     def __init__(self):
         self.valores = []
         self.tiempo = None
 
     def from_hex(self, data, cualificador_ev):
-        adr_aux = {
-            9: 8,
-            10: 6,
-            11: 3
-        }
-
         position = 0
         for i in range(0, cualificador_ev):
-            address = struct.unpack("B", data[position:position + 1])[0]
-            amount = adr_aux[address]
-            position += 1
-            time_pos = position + (amount * 5)
-            self.tiempo = TimeA()
-            self.tiempo.from_hex(data[time_pos:time_pos + 5])
-
-            for t in range(1, amount+1):
-                total = struct.unpack("I", data[position:position+4])[0]
-                quality = struct.unpack("B", data[position+4:position+5])[0]
-                self.valores.append(IntegratedTotals(t, total, quality,
-                                                     self.tiempo.datetime))
-                position += 5
-                if t == amount:
-                    position += 5
+            address = struct.unpack_from("B", data, position)[0]
+            block = M_IB_TK_2.BLOCKS[address]
+            values = block.unpack_from(data, position)
+            position += block.size
+            self.tiempo = TimeA.decode(data, position)
+            # all the totals of a block share its time
+            fecha = cp40_datetime(data, position)
+            position += TimeA.CP40.size
+            self.valores.extend([
+                IntegratedTotals(t, total, quality, fecha)
+                for t, total, quality in zip(
+                    range(1, len(values)), values[1::2], values[2::2]
+                )
+            ])
 
 
 class C_PC_NA_2(BaseAppAsdu):
@@ -755,13 +845,12 @@ class M_PC_NA_2(BaseAppAsdu):
     def from_hex(self, data, cualificador_ev):
         position = 0
         for i in range(0, cualificador_ev):
-            address = struct.unpack("B", data[position:position + 1])[0]
+            address = struct.unpack_from("B", data, position)[0]
             position += 1
-            power = struct.unpack("I", data[position:position + 4])[0]
+            power = struct.unpack_from("I", data, position)[0]
             position += 4
             self.valores.append(ContractedPower(address, power))
-        self.tiempo = TimeA()
-        self.tiempo.from_hex(data[position:position + 5])
+        self.tiempo = TimeA.decode(data, position)
 
 
 class C_RM_NA_2(BaseAppAsdu):
@@ -805,35 +894,34 @@ class M_RM_NA_2(BaseAppAsdu):
          self.active_contracts = []
 
      def from_hex(self, data, cualificador_ev):
-         self.codigo_fabricante = struct.unpack("B", data[0:1])[0]
+         self.codigo_fabricante = struct.unpack_from("B", data, 0)[0]
          self.modelo_fabricante = (
-             chr(struct.unpack("B", data[1:2])[0] or '') +
-             chr(struct.unpack("B", data[2:3])[0] or '')
+             chr(struct.unpack_from("B", data, 1)[0] or '') +
+             chr(struct.unpack_from("B", data, 2)[0] or '')
          )
-         self.firmware = struct.unpack("B", data[3:4])[0]
-         self.codigo_equipo = struct.unpack("I", data[4:8])[0]
+         self.firmware = struct.unpack_from("B", data, 3)[0]
+         self.codigo_equipo = struct.unpack_from("I", data, 4)[0]
          # 0-4 bits: month 5-8: year
-         iec_date_field = struct.unpack("B", data[8:9])[0]
+         iec_date_field = struct.unpack_from("B", data, 8)[0]
          self.iec_date = '{}/{}'.format(iec_date_field & 15, ((iec_date_field & 240) >> 4) + 2000)
-         self.iec_version_date = TimeA()
-         self.iec_version_date.from_hex(data[9:14])
-         self.battery = struct.unpack("B", data[14:15])[0]
+         self.iec_version_date = TimeA.decode(data, 9)
+         self.battery = struct.unpack_from("B", data, 14)[0]
          position = 15
          for serialport in ['1' ,'2']:
              speed = SERIAL_PORT_SPEED[
-                 struct.unpack("B", data[position:position+1])[0]
+                 struct.unpack_from("B", data, position)[0]
              ]
              position+=1
              params = SERIAL_PORT_PARAM[
-                 struct.unpack("B", data[position:position+1])[0]
+                 struct.unpack_from("B", data, position)[0]
              ]
              position += 1
-             mode = struct.unpack("B", data[position:position + 1])[0]
+             mode = struct.unpack_from("B", data, position)[0]
              position += 1
              start_string = ''
              eof = False
              for i in range(0, 20):
-                 val = struct.unpack("B", data[position:position + 1])[0]
+                 val = struct.unpack_from("B", data, position)[0]
                  position += 1
                  if val != 0 and not eof:
                      start_string += chr(val)
@@ -843,19 +931,19 @@ class M_RM_NA_2(BaseAppAsdu):
              )
              setattr(self, "serial_port_{}".format(serialport), portconf)
          self.optical_port = SerialPortConf(
-             SERIAL_PORT_SPEED[struct.unpack("B", data[40:41])[0]],
-             SERIAL_PORT_PARAM[struct.unpack("B", data[41:42])[0]],
+             SERIAL_PORT_SPEED[struct.unpack_from("B", data, 40)[0]],
+             SERIAL_PORT_PARAM[struct.unpack_from("B", data, 41)[0]],
              0,
              ''
          )
-         self.primari_V = struct.unpack("I", data[42:46])[0] / 10.0
-         self.secondary_V = struct.unpack("I", data[46:50])[0] / 10.0
-         self.primari_I = struct.unpack("I", data[50:54])[0] / 10.0
-         self.secondary_I = struct.unpack("I", data[54:58])[0] /10.0
-         self.integration_period_1 = struct.unpack("B", data[58:59])[0]
-         self.integration_period_2 = struct.unpack("B", data[59:60])[0]
-         self.integration_period_3 = struct.unpack("B", data[60:61])[0]
-         active_contracts_byte = struct.unpack("B", data[61:62])[0]
+         self.primari_V = struct.unpack_from("I", data, 42)[0] / 10.0
+         self.secondary_V = struct.unpack_from("I", data, 46)[0] / 10.0
+         self.primari_I = struct.unpack_from("I", data, 50)[0] / 10.0
+         self.secondary_I = struct.unpack_from("I", data, 54)[0] /10.0
+         self.integration_period_1 = struct.unpack_from("B", data, 58)[0]
+         self.integration_period_2 = struct.unpack_from("B", data, 59)[0]
+         self.integration_period_3 = struct.unpack_from("B", data, 60)[0]
+         active_contracts_byte = struct.unpack_from("B", data, 61)[0]
          contracts = []
          for i in [0, 2, 4]:
              if active_contracts_byte & (2 << i):
@@ -892,8 +980,7 @@ class M_DF_NA_2(BaseAppAsdu):
     def from_hex(self, data, cualificador_ev):
         position = 0
         for i in range(0, cualificador_ev):
-            day = TimeA()
-            day.from_hex(data[position:position + 5])
+            day = TimeA.decode(data, position)
             position += 5
             self.valores.append(day)
 
@@ -953,9 +1040,11 @@ class R_TA_IN_2(BaseAppAsdu):
     def from_hex(self, data, cualificador_ev):
         pos = 0
         for obj_idx in range(cualificador_ev):
-            object_id = struct.unpack("B", data[pos:pos+1])[0]
+            object_id = struct.unpack_from("B", data, pos)[0]
             pos +=1
-            object_class = globals()[TARIFF_CONF_OBJECTS[object_id]['object']]
+            object_class = R_TA_IN_2.object_classes[object_id]
+            if object_class is None:
+                raise KeyError(object_id)
             the_object = object_class()
             length = the_object.from_hex(data[pos:])
             self.valores.append(the_object)
@@ -1031,13 +1120,16 @@ class R_RM_R2_2(BaseAppAsdu):
     def from_hex(self, data, cualificador_ev):
         pos = 0
         for obj_idx in range(cualificador_ev):
-            object_id = struct.unpack("B", data[pos:pos+1])[0]
+            object_id = struct.unpack_from("B", data, pos)[0]
             pos +=1
-            object_class = globals()[REGISTRADOR_RM2_OBJECTS[object_id]['object']]
+            object_class = R_RM_R2_2.object_classes[object_id]
+            if object_class is None:
+                raise KeyError(object_id)
             the_object = object_class()
-            the_object.from_hex(data[pos:pos + the_object.length])
+            length = object_class.length
+            the_object.from_hex(data[pos:pos + length])
             self.valores.append(the_object)
-            pos += the_object.length
+            pos += length
 
     def to_bytes(self):
         pass
@@ -1090,19 +1182,34 @@ class R_IN_VA_2(BaseAppAsdu):
     def from_hex(self, data, cualificador_ev):
         pos = 0
         for obj_idx in range(cualificador_ev):
-            object_id = struct.unpack("B", data[pos:pos+1])[0]
+            object_id = struct.unpack_from("B", data, pos)[0]
             pos +=1
-            object_class = globals()[INSTANT_VALUES_OBJECTS[object_id]['object']]
+            object_class = R_IN_VA_2.object_classes[object_id]
+            if object_class is None:
+                raise KeyError(object_id)
             the_object = object_class()
-            the_object.from_hex(data[pos:pos + the_object.length])
+            length = object_class.length
+            the_object.from_hex(data[pos:pos + length])
             self.valores.append(the_object)
-            pos += the_object.length
+            pos += length
 
     def to_bytes(self):
         pass
 
 
-class TimeBase():
+class TimeBase(object):
+
+    # local time conversions, the DstTable of TIMEZONE. The decoders of all
+    # the ASDUs use TimeA and TimeB, so this is the timezone of every meter
+    # in the process; a subclass with another table only applies where it
+    # is passed explicitly, as the time_class of cp40_datetime
+    dst_table = TIMEZONE_TABLE
+
+    __slots__ = (
+        'minute', 'TIS', 'IV', 'hour', 'RES1', 'SU', 'dayofmonth',
+        'dayofweek', 'month', 'ETI', 'PTI', 'year', 'RES2', 'seconds',
+        'microseconds'
+    )
 
     def __init__(self, fecha=None):
 
@@ -1111,7 +1218,7 @@ class TimeBase():
 
         locfecha = fecha
         if not fecha.tzinfo:
-            locfecha = TIMEZONE.localize(fecha)
+            locfecha = self.dst_table.localize(fecha)
         self.minute = locfecha.minute  # UI6
         self.TIS = 0  # BS1 TIS=tariff information switch
         self.IV = 0  # BS1 IV=invalid
@@ -1135,6 +1242,43 @@ class TimeBase():
         self.seconds = locfecha.second
         self.microseconds = locfecha.microsecond
 
+    @classmethod
+    def decode(cls, data, offset=0):
+        """Time of the octets at offset. The fields are only set by
+        from_hex, the current time is not localized as in __init__"""
+        tiempo = cls.__new__(cls)
+        tiempo.from_hex(data, offset)
+        return tiempo
+
+    def set_cp40(self, minute, hour, day, month, year):
+        """Sets the date fields from the five CP40 octets"""
+        self.minute = minute & 0x3f
+        self.TIS = (minute >> 6) & 0x01
+        self.IV = minute >> 7
+        self.hour = hour & 0x1f
+        self.RES1 = (hour >> 5) & 0x03
+        self.SU = hour >> 7
+        self.dayofmonth = (day & 0x1f) or 1
+        self.dayofweek = day >> 5
+        self.month = (month & 0x0f) or 1
+        self.ETI = (month >> 4) & 0x03
+        self.PTI = month >> 6
+        self.year = year & 0x7f
+        self.RES2 = year >> 7
+
+    def get_cp40(self):
+        """Returns the five CP40 octets of the date fields"""
+        return (
+            (self.minute & 0x3f) | (self.TIS & 0x01) << 6
+            | (self.IV & 0x01) << 7,
+            (self.hour & 0x1f) | (self.RES1 & 0x03) << 5
+            | (self.SU & 0x01) << 7,
+            (self.dayofmonth & 0x1f) | (self.dayofweek & 0x07) << 5,
+            (self.month & 0x0f) | (self.ETI & 0x03) << 4
+            | (self.PTI & 0x03) << 6,
+            (self.year & 0x7f) | (self.RES2 & 0x01) << 7,
+        )
+
     @property
     def datetime(self):
         year = self.year + 2000
@@ -1143,7 +1287,7 @@ class TimeBase():
             year, self.month, self.dayofmonth, self.hour, self.minute,
             self.seconds, self.microseconds
         )
-        return TIMEZONE.localize(dt, is_dst=dst)
+        return self.dst_table.localize(dt, is_dst=dst)
 
     def __repr__(self):
         # output = "  -- TiempoA Begin -- \n"
@@ -1170,129 +1314,122 @@ class TimeBase():
 
 class TimeA(TimeBase):
 
-    def from_hex(self, data):
-        reversed_bytes = bitstring.BitArray(bytearray(reversed(data)))
-        reversed_bits = bitstring.BitStream(reversed(reversed_bytes))
-        self.minute = bitstring.BitArray(reversed(reversed_bits.read(6))).uint
-        self.TIS = reversed_bits.read(1).uint
-        self.IV = reversed_bits.read(1).uint
-        self.hour = bitstring.BitArray(reversed(reversed_bits.read(5))).uint
-        self.RES1 = bitstring.BitArray(reversed(reversed_bits.read(2))).uint
-        self.SU = reversed_bits.read(1).uint
-        self.dayofmonth = bitstring.BitArray(reversed(reversed_bits.read(5)))\
-                                   .uint or 1
-        self.dayofweek = bitstring.BitArray(reversed(reversed_bits.read(3)))\
-                                  .uint
-        self.month = bitstring.BitArray(
-            reversed(reversed_bits.read(4))
-        ).uint or 1
-        self.ETI = bitstring.BitArray(reversed(reversed_bits.read(2))).uint
-        self.PTI = bitstring.BitArray(reversed(reversed_bits.read(2))).uint
-        self.year = bitstring.BitArray(reversed(reversed_bits.read(7))).uint
-        self.RES2 = reversed_bits.read(1).uint
+    # minute, hour, day, month and year octets
+    CP40 = struct.Struct("<5B")
 
+    __slots__ = ()
+
+    def from_hex(self, data, offset=0):
+        self.set_cp40(*TimeA.CP40.unpack_from(data, offset))
         self.seconds = 0
         self.microseconds = 0
 
     def to_bytes(self):
-        response = bitstring.BitArray()
-        thedata = bitstring.BitArray(bytearray([self.minute]))
-        response = response + thedata[-1:-7:-1]
-        thedata = bitstring.BitArray(bytearray([self.TIS]))
-        response = response + thedata[-1:]
-        thedata = bitstring.BitArray(bytearray([self.IV]))
-        response = response + thedata[-1:]
-        thedata = bitstring.BitArray(bytearray([self.hour]))
-        response = response + thedata[-1:-6:-1]
-        thedata = bitstring.BitArray(bytearray([self.RES1]))
-        response = response + thedata[-1:-3:-1]
-        thedata = bitstring.BitArray(bytearray([self.SU]))
-        response = response + thedata[-1:]
-        thedata = bitstring.BitArray(bytearray([self.dayofmonth]))
-        response = response + thedata[-1:-6:-1]
-        thedata = bitstring.BitArray(bytearray([self.dayofweek]))
-        response = response + thedata[-1:-4:-1]
-        thedata = bitstring.BitArray(bytearray([self.month]))
-        response = response + thedata[-1:-5:-1]
-        thedata = bitstring.BitArray(bytearray([self.ETI]))
-        response = response + thedata[-1:-3:-1]
-        thedata = bitstring.BitArray(bytearray([self.PTI]))
-        response = response + thedata[-1:-3:-1]
-        thedata = bitstring.BitArray(bytearray([self.year]))
-        response = response + thedata[-1:-8:-1]
-        thedata = bitstring.BitArray(bytearray([self.RES2]))
-        response = response + thedata[-1:]
-        response = response[::-1]
-        inbytes = response.tobytes()[::-1]
-        return inbytes
+        return TimeA.CP40.pack(*self.get_cp40())
 
 
 class TimeB(TimeBase):
 
-    def from_hex(self, data):
-        reversed_bytes = bitstring.BitArray(bytearray(reversed(data)))
-        reversed_bits = bitstring.BitStream(reversed(reversed_bytes))
+    # milliseconds (10 bits) + seconds (6 bits), then the CP40 octets
+    CP56 = struct.Struct("<H5B")
+
+    __slots__ = ()
 
-        milliseconds = bitstring.BitArray(reversed(reversed_bits.read(10))).uint
-        self.microseconds = milliseconds * 1000
-        self.seconds = bitstring.BitArray(reversed(reversed_bits.read(6))).uint
-        self.minute = bitstring.BitArray(reversed(reversed_bits.read(6))).uint
-        self.TIS = reversed_bits.read(1).uint
-        self.IV = reversed_bits.read(1).uint
-        self.hour = bitstring.BitArray(reversed(reversed_bits.read(5))).uint
-        self.RES1 = bitstring.BitArray(reversed(reversed_bits.read(2))).uint
-        self.SU = reversed_bits.read(1).uint
-        self.dayofmonth = bitstring.BitArray(
-            reversed(reversed_bits.read(5))
-        ).uint or 1
-        self.dayofweek = bitstring.BitArray(reversed(reversed_bits.read(3))).uint
-        self.month = bitstring.BitArray(
-            reversed(reversed_bits.read(4))
-        ).uint or 1
-        self.ETI = bitstring.BitArray(reversed(reversed_bits.read(2))).uint
-        self.PTI = bitstring.BitArray(reversed(reversed_bits.read(2))).uint
-        self.year = bitstring.BitArray(reversed(reversed_bits.read(7))).uint
-        self.RES2 = reversed_bits.read(1).uint
+    def from_hex(self, data, offset=0):
+        (milliseconds, minute, hour, day, month,
+         year) = TimeB.CP56.unpack_from(data, offset)
+        self.microseconds = (milliseconds & 0x3ff) * 1000
+        self.seconds = milliseconds >> 10
+        self.set_cp40(minute, hour, day, month, year)
 
     def to_bytes(self):
-        response = bitstring.BitArray()
-
-        milliseconds = int(self.microseconds / 1000)
-        thedata = bitstring.BitArray(bytearray(
-            [milliseconds >> 8, milliseconds & 0xFF]
-        ))
-        response = response + thedata[-1:-11:-1]
-        thedata = bitstring.BitArray(bytearray([self.seconds]))
-        response = response + thedata[-1:-7:-1]
-        thedata = bitstring.BitArray(bytearray([self.minute]))
-        response = response + thedata[-1:-7:-1]
-        thedata = bitstring.BitArray(bytearray([self.TIS]))
-        response = response + thedata[-1:]
-        thedata = bitstring.BitArray(bytearray([self.IV]))
-        response = response + thedata[-1:]
-        thedata = bitstring.BitArray(bytearray([self.hour]))
-        response = response + thedata[-1:-6:-1]
-        thedata = bitstring.BitArray(bytearray([self.RES1]))
-        response = response + thedata[-1:-3:-1]
-        thedata = bitstring.BitArray(bytearray([self.SU]))
-        response = response + thedata[-1:]
-        thedata = bitstring.BitArray(bytearray([self.dayofmonth]))
-        response = response + thedata[-1:-6:-1]
-        thedata = bitstring.BitArray(bytearray([self.dayofweek]))
-        response = response + thedata[-1:-4:-1]
-        thedata = bitstring.BitArray(bytearray([self.month]))
-        response = response + thedata[-1:-5:-1]
-        thedata = bitstring.BitArray(bytearray([self.ETI]))
-        response = response + thedata[-1:-3:-1]
-        thedata = bitstring.BitArray(bytearray([self.PTI]))
-        response = response + thedata[-1:-3:-1]
-        thedata = bitstring.BitArray(bytearray([self.year]))
-        response = response + thedata[-1:-8:-1]
-        thedata = bitstring.BitArray(bytearray([self.RES2]))
-        response = response + thedata[-1:]
-        response = response[::-1]
-        inbytes = response.tobytes()[::-1]
-        return inbytes
+        milliseconds = int(self.microseconds / 1000) & 0x3ff
+        return TimeB.CP56.pack(
+            milliseconds | (self.seconds & 0x3f) << 10, *self.get_cp40()
+        )
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class DatetimeCache(object):
+    """Bounded LRU cache of localized datetimes keyed by raw time octets"""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, factory):
+        """Cached value of key, factory() computes it on a miss"""
+        with self._lock:
+            try:
+                value = self._values.pop(key)
+            except KeyError:
+                self.misses += 1
+            else:
+                self._values[key] = value
+                self.hits += 1
+                return value
+        value = factory()
+        with self._lock:
+            self._values[key] = value
+            if len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+        return value
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize,
+                         len(self._values))
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+DATETIME_CACHE = DatetimeCache()
+EPOCH_CACHE = DatetimeCache()
+
+
+def _time_datetime(time_class, data, offset):
+    return time_class.decode(data, offset).datetime
+
+
+def cp40_octets_datetime(octets, time_class=TimeA):
+    """Localized datetime of a tuple with the five TimeA (CP40) octets, in
+    the timezone of time_class.dst_table"""
+    return DATETIME_CACHE.get(
+        (time_class.dst_table, octets),
+        lambda: _time_datetime(time_class, bytearray(octets), 0)
+    )
+
+
+def cp40_octets_epoch(octets, time_class=TimeA):
+    """UTC epoch seconds of a tuple with the five TimeA (CP40) octets"""
+    return EPOCH_CACHE.get(
+        (time_class.dst_table, octets), lambda: calendar.timegm(
+            cp40_octets_datetime(octets, time_class).utctimetuple()
+        )
+    )
+
+
+def cp40_datetime(data, offset=0, time_class=TimeA):
+    """Localized datetime of the TimeA (CP40) octets at offset"""
+    return cp40_octets_datetime(
+        TimeA.CP40.unpack_from(data, offset), time_class
+    )
+
+
+def cp56_datetime(data, offset=0, time_class=TimeB):
+    """Localized datetime of the TimeB (CP56) octets at offset"""
+    key = (time_class.dst_table, TimeB.CP56.unpack_from(data, offset))
+    return DATETIME_CACHE.get(
+        key, lambda: _time_datetime(time_class, data, offset)
+    )
 
 
 class Seasons():
@@ -1308,25 +1445,24 @@ class Seasons():
         self.fecha_activacion = None
 
     def from_hex(self, data):
-        self.valores = data
-        self.sentido = struct.unpack("B", data[0:1])[0]
+        self.valores = bytearray(data)
+        self.sentido = struct.unpack_from("B", data, 0)[0]
 #        print("Sentido {}".format(self.sentido))
-        self.tipo = struct.unpack("B", data[1:2])[0]
+        self.tipo = struct.unpack_from("B", data, 1)[0]
 #        print("Tipo {}".format(self.tipo))
-        num_temporadas = struct.unpack("B", data[2:3])[0]
+        num_temporadas = struct.unpack_from("B", data, 2)[0]
 #        print("Num Temporadas {}".format(num_temporadas))
         pos = 3
         for temporada in range(num_temporadas):
-            fecha_inicio = TimeA()
-            fecha_inicio.from_hex(data[pos:pos + 5])
+            fecha_inicio = TimeA.decode(data, pos)
             pos += 5
-            tipos = struct.unpack("B", data[pos:pos + 1])[0]
+            tipos = struct.unpack_from("B", data, pos)[0]
             pos += 1
             tipo_laborable = tipos & 0x0f
             tipo_festivo = (tipos & 0xf0) >> 4
             s = Season(temporada + 1, fecha_inicio, tipo_laborable, tipo_festivo)
             self.temporadas.append(s)
-        num_tipo_dias = struct.unpack("B", data[pos:pos + 1])[0]
+        num_tipo_dias = struct.unpack_from("B", data, pos)[0]
         pos += 1
         for tipo_dia in range(num_tipo_dias):
             horas = ""
@@ -1335,8 +1471,7 @@ class Seasons():
                 horas += str((data[pos] & 0xf0) >> 4)
                 pos += 1
             self.dias.append(Day(tipo_dia + 1, horas))
-        self.fecha_activacion = TimeA()
-        self.fecha_activacion.from_hex(data[pos:pos + 5])
+        self.fecha_activacion = TimeA.decode(data, pos)
         pos += 5
 #        print(self.fecha_activacion)
 
@@ -1364,12 +1499,11 @@ class CurrentPeriods():
         self.valores = None
 
     def from_hex(self, data):
-        contrato1 = struct.unpack("B", data[0:1])[0]
-        contrato2 = struct.unpack("B", data[1:2])[0]
-        contrato3 = struct.unpack("B", data[2:3])[0]
+        contrato1 = struct.unpack_from("B", data, 0)[0]
+        contrato2 = struct.unpack_from("B", data, 1)[0]
+        contrato3 = struct.unpack_from("B", data, 2)[0]
 
-        dt = TimeA()
-        dt.from_hex(data[3:8])
+        dt = TimeA.decode(data, 3)
 
         self.valores = {'c1': contrato1, 'c2': contrato2, 'c3': contrato3, 'fecha': dt}
 
@@ -1391,7 +1525,7 @@ class Battery():
         self.valores = None
 
     def from_hex(self, data):
-        battery = struct.unpack("B", data[0:1])[0]
+        battery = struct.unpack_from("B", data, 0)[0]
 
         self.valores = battery
 
@@ -1414,7 +1548,7 @@ class TimeSavingChange():
         self.valores = None
 
     def from_hex(self, data):
-        tsbyte = struct.unpack("B", data[0:1])[0]
+        tsbyte = struct.unpack_from("B", data, 0)[0]
 
         # 1: No hi ha calcul automàtic
         # 2: Calcul automàtic
@@ -1439,7 +1573,7 @@ class MinCloseTime():
         self.valores = None
 
     def from_hex(self, data):
-        self.valores = struct.unpack("B", data[0:1])[0]
+        self.valores = struct.unpack_from("B", data, 0)[0]
 
         return self.valores
 
@@ -1462,8 +1596,8 @@ class Alarm():
 
     def from_hex(self, data):
 
-        self.critic_alarm_active = struct.unpack("B", data[0:1])[0]
-        self.non_critic_alarm_active = struct.unpack("B", data[1:2])[0]
+        self.critic_alarm_active = struct.unpack_from("B", data, 0)[0]
+        self.non_critic_alarm_active = struct.unpack_from("B", data, 1)[0]
 
         self.valores = [
             (self.critic_alarm_active & 0x03) > 1 ,
@@ -1497,9 +1631,9 @@ class VoltageFault():
 
     def from_hex(self, data):
 
-        self.phase1_voltage_fault = struct.unpack("B", data[0:1])[0]
-        self.phase2_voltage_fault = struct.unpack("B", data[1:2])[0]
-        self.phase3_voltage_fault = struct.unpack("B", data[2:3])[0]
+        self.phase1_voltage_fault = struct.unpack_from("B", data, 0)[0]
+        self.phase2_voltage_fault = struct.unpack_from("B", data, 1)[0]
+        self.phase3_voltage_fault = struct.unpack_from("B", data, 2)[0]
 
         self.valores = [
             (self.phase1_voltage_fault & 0x03) > 1 ,
@@ -1536,8 +1670,8 @@ class CurvePeriod():
 
     def from_hex(self, data):
 
-        self.period_1 = struct.unpack("B", data[0:1])[0]
-        self.period_2 = struct.unpack("B", data[1:2])[0]
+        self.period_1 = struct.unpack_from("B", data, 0)[0]
+        self.period_2 = struct.unpack_from("B", data, 1)[0]
 
         self.valores = [
             self.period_1 ,
@@ -1563,10 +1697,10 @@ class TrafoRatio():
         self.valores = None
 
     def from_hex(self, data):
-        primary_v_dV = struct.unpack("I", data[0:4])[0]
-        secondary_v_dV = struct.unpack("I", data[4:8])[0]
-        primary_i_dA = struct.unpack("I", data[8:12])[0]
-        secondary_i_dA = struct.unpack("I", data[12:16])[0]
+        primary_v_dV = struct.unpack_from("I", data, 0)[0]
+        secondary_v_dV = struct.unpack_from("I", data, 4)[0]
+        primary_i_dA = struct.unpack_from("I", data, 8)[0]
+        secondary_i_dA = struct.unpack_from("I", data, 12)[0]
 
         self.valores = [
             TrafoRatioVals(primary_v_dV, secondary_v_dV),
@@ -1596,7 +1730,7 @@ class ClockSincro():
         self.valores = None
 
     def from_hex(self, data):
-        self.clocksincro_value = struct.unpack("B", data[0:1])[0]
+        self.clocksincro_value = struct.unpack_from("B", data, 0)[0]
         clock_source = (self.clocksincro_value & 0x03) > 1 and 'quartz' or 'network'
 
         self.valores = clock_source
@@ -1621,7 +1755,7 @@ class ProgramId():
 
     def from_hex(self, data):
         for i in range(0, 25):
-            self.bytes += chr(struct.unpack("B", data[i:i+1])[0])
+            self.bytes += chr(struct.unpack_from("B", data, i)[0])
 
         self.valores = self.bytes
 
@@ -1644,7 +1778,7 @@ class ButtonClosing():
         self.valores = None
 
     def from_hex(self, data):
-        self.buttonclosing = struct.unpack("B", data[0:1])[0]
+        self.buttonclosing = struct.unpack_from("B", data, 0)[0]
         enabled = (self.buttonclosing & 0x03) > 1 and True or False
 
         self.valores = enabled
@@ -1668,14 +1802,13 @@ class TotalizadoresInstantaneos():
         self.valores = None
 
     def from_hex(self, data):
-        ai = struct.unpack("I", data[0:4])[0]
-        ae = struct.unpack("I", data[4:8])[0]
-        r1 = struct.unpack("I", data[8:12])[0]
-        r2 = struct.unpack("I", data[12:16])[0]
-        r3 = struct.unpack("I", data[16:20])[0]
-        r4 = struct.unpack("I", data[20:24])[0]
-        dt = TimeA()
-        dt.from_hex(data[24:29])
+        ai = struct.unpack_from("I", data, 0)[0]
+        ae = struct.unpack_from("I", data, 4)[0]
+        r1 = struct.unpack_from("I", data, 8)[0]
+        r2 = struct.unpack_from("I", data, 12)[0]
+        r3 = struct.unpack_from("I", data, 16)[0]
+        r4 = struct.unpack_from("I", data, 20)[0]
+        dt = TimeA.decode(data, 24)
 
         it = InstantTotals(
             ai & 0x07ffffff, ai & 0x8000000 and False or True,  # kWh , 0 valid/1 invalid
@@ -1725,8 +1858,7 @@ class PotenciaInstantanea():
 
             self.valores.append(ip)
 
-        dt = TimeA()
-        dt.from_hex(data[32:37])
+        dt = TimeA.decode(data, 32)
         self.valores.append(dt)  # Localized datetime
         return self.valores
 
@@ -1760,8 +1892,7 @@ class IVInstantaneos():
             ipiv = InstantPhaseVI(phase, intensidad_dA / 10.0, tension_dV / 10.0, not invalid)
             self.valores.append(ipiv)
 
-        dt = TimeA()
-        dt.from_hex(data[21:26])
+        dt = TimeA.decode(data, 21)
         self.valores.append(dt)
 
         return self.valores
@@ -1772,3 +1903,9 @@ class IVInstantaneos():
             output += '{}\n'.format(value)
         output += "-- IVInstantaneos END--\n"
         return output
+
+
+# object classes are resolved once all of them are defined
+R_TA_IN_2.object_classes = object_classes(TARIFF_CONF_OBJECTS)
+R_RM_R2_2.object_classes = object_classes(REGISTRADOR_RM2_OBJECTS)
+R_IN_VA_2.object_classes = object_classes(INSTANT_VALUES_OBJECTS)
@@ -0,0 +1,198 @@
+"""Binary frame archive
+
+Append-only file with one record per frame. Each record has a header
+with the frame length, the meter id, the direction and the timestamp
+followed by the frame bytes as they were sent or received.
+
+A sidecar index file (archive path + '.idx') has one entry per record
+with its offset, meter, ASDU type and timestamp. Fixed length frames
+are indexed with type FIXED_FRAME_TYPE.
+"""
+from __future__ import absolute_import
+import bisect
+import logging
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+from .base_asdu import AsduParser
+
+
+logger = logging.getLogger(__name__)
+
+DIRECTION_IN = 0
+DIRECTION_OUT = 1
+
+FIXED_FRAME_TYPE = 0
+
+# length, meter, direction, timestamp
+RECORD = struct.Struct("<HIBd")
+# offset, meter, type, timestamp
+INDEX = struct.Struct("<QIBd")
+
+INDEX_SUFFIX = '.idx'
+
+
+ArchiveRecord = namedtuple(
+    'ArchiveRecord', ['offset', 'meter', 'direction', 'timestamp', 'frame']
+)
+
+
+def frame_type(frame):
+    """ASDU type of raw frame bytes, FIXED_FRAME_TYPE for fixed frames"""
+    if frame[0:1] == b'\x68' and len(frame) > 7:
+        return bytearray(frame[7:8])[0]
+    return FIXED_FRAME_TYPE
+
+
+class ArchiveWriter(object):
+    """Appends frames to an archive and its index"""
+
+    def __init__(self, path):
+        self.path = path
+        self.archive = open(path, 'ab')
+        self.index = open(path + INDEX_SUFFIX, 'ab')
+        self.offset = os.path.getsize(path)
+
+    def write(self, frame, meter, direction=DIRECTION_IN, timestamp=None):
+        """Append a frame.
+
+        :param frame: FixedAsdu, VariableAsdu or the frame bytes
+        :param meter: meter id, the link address (DER) for example
+        :param direction: DIRECTION_IN or DIRECTION_OUT
+        :param timestamp: epoch seconds, now by default
+        :return: offset of the record in the archive
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        buffer = bytes(getattr(frame, 'buffer', frame))
+        offset = self.offset
+        self.archive.write(
+            RECORD.pack(len(buffer), meter, direction, timestamp)
+        )
+        self.archive.write(buffer)
+        self.index.write(
+            INDEX.pack(offset, meter, frame_type(buffer), timestamp)
+        )
+        self.offset += RECORD.size + len(buffer)
+        return offset
+
+    def flush(self):
+        self.archive.flush()
+        self.index.flush()
+
+    def close(self):
+        self.archive.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ArchiveReader(object):
+    """Random access to the frames of an archive.
+
+    The archive is memory-mapped and the index is loaded in memory grouped
+    by (meter, type) and sorted by timestamp. If the index file is missing
+    it is rebuilt walking the archive records.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = b''
+        self.size = os.path.getsize(path)
+        if self.size:
+            with open(path, 'rb') as archive:
+                self.data = mmap.mmap(
+                    archive.fileno(), 0, access=mmap.ACCESS_READ
+                )
+        self.timestamps = {}
+        self.offsets = {}
+        self.load_index()
+
+    def load_index(self):
+        entries = []
+        index_path = self.path + INDEX_SUFFIX
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as index:
+                content = index.read()
+            content = content[:len(content) - len(content) % INDEX.size]
+            for offset, meter, tipo, timestamp in _iter_unpack(INDEX,
+                                                               content):
+                # records written after the archive was mapped
+                if offset < self.size:
+                    entries.append((meter, tipo, timestamp, offset))
+        else:
+            logger.warning("Index of %s not found, rebuilding it", self.path)
+            for record in self.scan():
+                entries.append((record.meter, frame_type(record.frame),
+                                record.timestamp, record.offset))
+        entries.sort()
+        for meter, tipo, timestamp, offset in entries:
+            key = (meter, tipo)
+            self.timestamps.setdefault(key, []).append(timestamp)
+            self.offsets.setdefault(key, []).append(offset)
+
+    def keys(self):
+        """(meter, type) pairs in the archive"""
+        return sorted(self.offsets)
+
+    def record(self, offset):
+        """Record at offset"""
+        header_end = offset + RECORD.size
+        length, meter, direction, timestamp = RECORD.unpack(
+            self.data[offset:header_end]
+        )
+        return ArchiveRecord(
+            offset, meter, direction, timestamp,
+            self.data[header_end:header_end + length]
+        )
+
+    def scan(self):
+        """All the records in archive order"""
+        offset = 0
+        while offset + RECORD.size <= self.size:
+            record = self.record(offset)
+            yield record
+            offset += RECORD.size + len(record.frame)
+
+    def records(self, meter, tipo, start=None, end=None):
+        """Records of a meter and ASDU type sorted by timestamp.
+
+        :param start: first epoch timestamp, included
+        :param end: last epoch timestamp, excluded
+        """
+        key = (meter, tipo)
+        timestamps = self.timestamps.get(key, [])
+        offsets = self.offsets.get(key, [])
+        first = 0 if start is None else bisect.bisect_left(timestamps, start)
+        last = (len(timestamps) if end is None
+                else bisect.bisect_left(timestamps, end))
+        for pos in range(first, last):
+            yield self.record(offsets[pos])
+
+    def frames(self, meter, tipo, start=None, end=None):
+        """Parsed frames of a meter and ASDU type sorted by timestamp"""
+        parser = AsduParser()
+        for record in self.records(meter, tipo, start, end):
+            for frame in parser.feed(bytearray(record.frame)):
+                yield frame
+
+    def close(self):
+        if self.size:
+            self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _iter_unpack(record_struct, content):
+    for offset in range(0, len(content), record_struct.size):
+        yield record_struct.unpack_from(content, offset)
@@ -0,0 +1,109 @@
+"""IP Physical Layer on asyncio streams
+
+Needs Python 3.5 or later, it is not imported by the rest of the package.
+"""
+import asyncio
+import binascii
+import logging
+import socket
+from collections import deque
+
+from .base_asdu import AsduParser
+from .protocol import ProtocolException
+
+
+logger = logging.getLogger(__name__)
+
+# Maximum bytes taken from the stream in each read
+READ_SIZE = 65536
+
+
+class AsyncIp(object):
+    """IP Physical Layer without threads, many connections can run on the
+    same event loop"""
+
+    def __init__(self, addr, waiting=5, resync=False):
+        """Create an asyncio IP Physical Layer.
+        :addr tuple: Address tuple (host, port)
+        :resync bool: drop wrong frames, see AsduParser
+        """
+        self.addr = addr
+        self.reader = None
+        self.writer = None
+        self.connected = False
+        self.waiting = waiting
+        self.resync = resync
+        self.asdu_parser = AsduParser(resync=resync)
+        # frames completed by the last chunk but not returned yet
+        self.pending_frames = deque()
+        logger.debug("New async IP with addr %s", addr)
+
+    async def connect(self):
+        """Connect to `self.addr`
+        """
+        self.reader, self.writer = await asyncio.open_connection(*self.addr)
+        sock = self.writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connected = True
+        logger.debug("Connection with %s created, wait %s", self.addr,
+                     self.waiting)
+        if self.waiting:
+            await asyncio.sleep(self.waiting)
+
+    async def disconnect(self):
+        """Disconnects
+        """
+        if self.writer is not None:
+            self.writer.close()
+            if hasattr(self.writer, 'wait_closed'):
+                try:
+                    await self.writer.wait_closed()
+                except (ConnectionError, OSError):
+                    pass
+        self.connected = False
+        logger.debug("Disconnected from %s", self.addr)
+
+    async def send_bytes(self, bts):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("=> Sending %s to %s", binascii.hexlify(bts),
+                         self.addr)
+        self.writer.write(bytes(bts))
+        await self.writer.drain()
+
+    async def send_byte(self, byte):
+        """Send a byte"""
+        await self.send_bytes(bytearray((byte, )))
+
+    async def read_available(self, timeout=60):
+        """Read the received bytes, waiting up to timeout for at least one.
+
+        :return: bytearray, or None when the connection is closed
+        :raises asyncio.TimeoutError: when nothing is received in time
+        """
+        data = await asyncio.wait_for(self.reader.read(READ_SIZE), timeout)
+        if not data:
+            return None
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("<= Reading %s from %s", binascii.hexlify(data),
+                         self.addr)
+        return bytearray(data)
+
+    async def read_frame(self, timeout=60):
+        """Read the next frame, timeout applies to each read from the stream
+
+        :raises ProtocolException: when the connection is closed
+        :raises asyncio.TimeoutError: when no bytes are received in time
+        """
+        frames = self.pending_frames
+        while not frames:
+            chunk = await self.read_available(timeout)
+            if chunk is None:
+                raise ProtocolException("Connection closed")
+            frames.extend(self.asdu_parser.feed(chunk))
+        return frames.popleft()
+
+    def empty_buffer(self):
+        """Drop the frames already received and the partial frame"""
+        self.pending_frames.clear()
+        self.asdu_parser = AsduParser(resync=self.resync)
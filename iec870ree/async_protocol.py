@@ -0,0 +1,309 @@
+"""Link and application layers as coroutines
+
+They keep the requests of LinkLayer and AppLayer, each round trip awaits
+the physical layer instead of blocking a thread. The physical layer must
+have `send_bytes` and `read_available` coroutines, as AsyncIp.
+
+Needs Python 3.6 or later (async generators), it is not imported by the
+rest of the package.
+"""
+import logging
+import time
+
+from .base_asdu import VariableAsdu
+from .app_asdu import *
+from .archive import DIRECTION_IN, DIRECTION_OUT
+from .columnar import IntegratedTotalsColumns
+from .protocol import (
+    AppLayer, LinkLayer, ProtocolException, CONTRACTS_REGISTERS,
+    READINGS_REGISTERS, REQUESTS_TYPES, EXT_INSTANT_OBJECTS, EXT_RM2_OBJECTS,
+    EXT_TARIFF_OBJECTS, lookup_objects, lookup_register, response_finished
+)
+
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+
+
+logger = logging.getLogger('iec870ree')
+
+
+class AsyncLinkLayer(LinkLayer):
+
+    async def send_frame(self, frame):
+        self.log_frame_sent(frame)
+        await self.physical_layer.send_bytes(frame.buffer)
+        self.archive_frame(frame, DIRECTION_OUT)
+
+    async def get_frame(self, timeout=60):
+        logger.info("receiving frame")
+        frames = self.pending_frames
+        while True:
+            while not frames:
+                chunk = await self.physical_layer.read_available(timeout)
+                if chunk is None:
+                    raise ProtocolException("Connection closed")
+                frames.extend(self.asdu_parser.feed(chunk))
+            frame = frames.popleft()
+            self.log_frame_received(frame)
+            self.archive_frame(frame, DIRECTION_IN)
+            if not (self.late_link_states and self.is_late_link_state(frame)):
+                return frame
+
+    async def empty_buffer(self):
+        self.reset_parser()
+        while 1:
+            try:
+                if await self.physical_layer.read_available(1) is None:
+                    break
+            except Exception as error:
+                logger.info("Buffer emptied. retrying")
+                break
+
+    async def link_state_request(self, retries=None):
+        resp = None
+        asdu = self.create_link_state_asdu()
+        logger.info("Send link state Retries %s", retries)
+        await self.send_frame(asdu)
+        try:
+            resp = await self.get_frame()
+        except Exception as e:
+            logger.info("Link State Exception: %s", e)
+            if retries:
+                retries -= 1
+                await self.empty_buffer()
+                resp = await self.link_state_request(retries=retries)
+        if resp is None:
+            raise ProtocolException("Link state request didn't get response")
+        return resp
+
+    async def wait_ready(self, max_wait=5, first_timeout=0.25):
+        """Coroutine version of LinkLayer.wait_ready, to use with
+        AsyncIp(addr, waiting=0)"""
+        asdu = self.create_link_state_asdu()
+        deadline = time.time() + max_wait
+        timeout = first_timeout
+        unanswered = 0
+        while True:
+            await self.send_frame(asdu)
+            try:
+                resp = await self.get_frame(timeout)
+            except ProtocolException:
+                raise
+            except Exception as e:
+                remaining = deadline - time.time()
+                logger.info("Link not ready after %s seconds: %s",
+                            timeout, e)
+                if remaining <= 0:
+                    raise ProtocolException(
+                        "Link state request didn't get response"
+                    )
+                self.reset_parser()
+                unanswered += 1
+                timeout = min(timeout * 2, remaining)
+                continue
+            self.late_link_states = unanswered
+            return resp
+
+    async def remote_link_reposition(self, retries=None):
+        resp = None
+        asdu = self.create_remote_link_reposition_asdu()
+        await self.send_frame(asdu)
+        try:
+            resp = await self.get_frame()
+        except Exception as e:
+            if retries:
+                retries -= 1
+                resp = await self.remote_link_reposition(retries=retries)
+        if resp is None:
+            raise ProtocolException("no answer received. maybe wrong der??")
+        return resp
+
+
+class AsyncAppLayer(AppLayer):
+    """AppLayer on an AsyncLinkLayer. The reads that yield several frames
+    are async generators, to be used with `async for`."""
+
+    async def process_request(self, request_asdu):
+        """Send the request and return the list of its responses"""
+        self.in_request = True
+        await self.link_layer.send_frame(request_asdu)
+        asdu_ack = await self.link_layer.get_frame()
+        if not asdu_ack:
+            raise ProtocolException("Didn't get ACK")
+        return [resp async for resp in self.process_requestresponse()]
+
+    async def process_requestresponse(self):
+        self.in_request = True
+        while True:
+            asdu = self.link_layer.create_class2_request_asdu(
+                self.link_layer.fcb
+            )
+            await self.link_layer.send_frame(asdu)
+            asdu_resp = await self.link_layer.get_frame()
+            if not asdu_resp:
+                logger.error("Did not receive ASDU response.")
+                raise ProtocolException("Didn't get ASDU")
+            yield asdu_resp
+
+            if not isinstance(asdu_resp, VariableAsdu):
+                self.check_content_timeout()
+                continue
+            if response_finished(asdu_resp):
+                self.in_request = False
+                break
+            self.check_content_timeout()
+
+    async def request_response(self, user_data, tipo, registro=0):
+        """Send a single frame request, return the response of type tipo
+        (any VariableAsdu when tipo is None)"""
+        asdu = self.create_asdu_request(user_data, registro)
+        for resp in await self.process_request(asdu):
+            if isinstance(resp, VariableAsdu) and (
+                    tipo is None or resp.tipo == tipo):
+                return resp
+
+    async def request_batches(self, user_data, tipo, registro=0,
+                              content=True):
+        """Send a request answered in batches, yield the responses of type
+        tipo"""
+        asdu = self.create_asdu_request(user_data, registro)
+        await self.process_request(asdu)
+        async for resp in self.process_requestresponse():
+            if isinstance(resp, VariableAsdu) and resp.tipo == tipo:
+                if content:
+                    self.reset_content_received()
+                yield resp
+
+    async def authenticate(self, clave_pm):
+        #183
+        asdu = self.create_asdu_request(C_AC_NA_2(clave_pm))
+        resps = await self.process_request(asdu)
+        return resps[0]
+
+    async def finish_session(self):
+        #187
+        asdu = self.create_asdu_request(C_FS_NA_2())
+        try:
+            await self.process_request(asdu)
+        except Exception as e:
+            logger.exception("error finishing session %s", e)
+
+    def read_absolute_values(self, start_date, end_date,
+                             register='daily_billings'):
+        #122
+        register = lookup_register(READINGS_REGISTERS, register)
+        return self.request_batches(C_CI_NT_2(start_date, end_date),
+                                    M_IT_TG_2.type, register)
+
+    def read_incremental_values(self, start_date, end_date,
+                                register='profiles'):
+        #123
+        register = lookup_register(READINGS_REGISTERS, register)
+        return self.request_batches(C_CI_NU_2(start_date, end_date),
+                                    M_IT_TK_2.type, register)
+
+    async def read_incremental_columns(self, start_date, end_date,
+                                       register='profiles'):
+        columns = IntegratedTotalsColumns()
+        async for resp in self.read_incremental_values(start_date, end_date,
+                                                       register):
+            columns.append_asdu(resp)
+        return columns
+
+    async def read_datetime(self):
+        #103
+        return await self.request_response(C_TI_NA_2(), M_TI_TA_2.type)
+
+    async def get_info(self):
+        #100
+        return await self.request_response(C_RD_NA_2(), P_MP_NA_2.type)
+
+    def current_tariff_info(self, register=1):
+        #133 current values
+        register = lookup_register(CONTRACTS_REGISTERS, register)
+        return self.request_batches(C_TA_VC_2(), M_TA_VC_2.type, register)
+
+    def stored_tariff_info(self, start_date, end_date, register=1):
+        #134 stored values
+        register = lookup_register(CONTRACTS_REGISTERS, register)
+        return self.request_batches(C_TA_VM_2(start_date, end_date),
+                                    M_TA_VM_2.type, register)
+
+    async def get_configuration(self):
+        #141
+        return await self.request_response(C_RM_NA_2(), M_RM_NA_2.type)
+
+    async def get_contracted_powers(self, register=1):
+        # 144 Get contracted powers
+        register = lookup_register(CONTRACTS_REGISTERS, register)
+        return await self.request_response(C_PC_NA_2(), M_PC_NA_2.type,
+                                           register)
+
+    async def set_datetime(self):
+        #181
+        return await self.request_response(C_CS_TA_2(), C_CS_TA_2.type)
+
+    def read_blocks_incremental_values(self, start_date, end_date,
+                                       register='profiles', adr_object=1):
+        # 190
+        if register in READINGS_REGISTERS and adr_object in REQUESTS_TYPES:
+            register = READINGS_REGISTERS[register]
+            adr_object = REQUESTS_TYPES[adr_object]
+        else:
+            logger.error("Wrong values for register and/or request")
+            raise ValueError
+        return self.request_batches(
+            C_CB_UN_2(start_date=start_date, end_date=end_date,
+                      adr_object=adr_object),
+            M_IB_TK_2.type, register, content=False
+        )
+
+    async def read_holiday_days(self, register=1):
+        # 147 Get holiday days
+        register = lookup_register(CONTRACTS_REGISTERS, register)
+        return await self.request_response(C_DF_NA_2(), M_DF_NA_2.type,
+                                           register)
+
+    def read_events(self, register=52, date_from=None, date_to=None):
+        # 102 Get Events between dates
+        if date_from is None:
+            date_from = datetime.now() - relativedelta(
+                days=30, hour=0, minute=0, second=0, microsecond=0
+            )
+        if date_to is None:
+            date_to = datetime.now()
+        return self.request_batches(
+            C_SP_NB_2(date_from=date_from, date_to=date_to),
+            M_SP_TA_2.type, register, content=False
+        )
+
+    async def read_event_records(self, register=52, date_from=None,
+                                 date_to=None):
+        """Same read as read_events, yields the EventRecord of each event"""
+        async for resp in self.read_events(register, date_from, date_to):
+            for record in M_SP_TA_2.decode_records(resp.data,
+                                                   resp.cualificador_ev):
+                yield record
+
+    # Protocol extension
+    async def ext_read_rm2_values(self, register=0, objects=['traforatio']):
+        # 157
+        object_codes = lookup_objects(EXT_RM2_OBJECTS, objects)
+        return await self.request_response(P_RM_R2_2(object_codes), None,
+                                           register)
+
+    # Protocol extension
+    async def ext_read_instant_values(self, register=0,
+                                      objects=['totalizadores']):
+        # 162
+        object_codes = lookup_objects(EXT_INSTANT_OBJECTS, objects)
+        return await self.request_response(P_IN_VA_2(object_codes), None,
+                                           register)
+
+    # Protocol extension
+    async def ext_read_contract_tariff_info(self, register=134,
+                                            objects=['special_days']):
+        # 150
+        object_codes = lookup_objects(EXT_TARIFF_OBJECTS, objects)
+        return await self.request_response(P_TA_IN_2(object_codes), None,
+                                           register)
@@ -1,26 +1,87 @@
-import ctypes
+import logging
 import struct
+from collections import deque
+import six
 from .app_asdu import AppAsduRegistry
 
 
+logger = logging.getLogger(__name__)
+
+
 class ParserException (Exception):
     pass
 
 
 class AsduParser:
-    def __init__(self):
+    def __init__(self, resync=False):
+        """Frame parser.
+
+        :param resync: when True a wrong frame doesn't raise a
+            ParserException, it is dropped and the parser looks for the next
+            frame header in the following bytes. discarded_bytes and
+            discarded_frames count what has been dropped.
+        """
         self.asdu = None
+        self.resync = resync
+        self.discarded_bytes = 0
+        self.discarded_frames = 0
+        self.frames = deque()
 
     def append_and_get_if_completed(self, bt):
-        if self.asdu is None:
-            if bt == 255:
-                return None
-            self.create_asdu(bt)
-
-        if self.asdu.append(bt):
-            last_asdu = self.asdu
-            self.asdu = None
-            return last_asdu
+        if bt is None:
+            raise ParserException("Wrong Init Byte None")
+        self.frames.extend(self.feed(bytearray((bt,))))
+        if self.frames:
+            return self.frames.popleft()
+
+    def feed(self, data):
+        """Append a chunk of received bytes to the parser.
+
+        :param data: bytes, bytearray or memoryview with the received bytes
+        :return: list with the frames completed by this chunk. The bytes of
+            a frame that is not completed yet are kept in the parser and the
+            frame is returned by a later call.
+        """
+        if six.PY2 and not isinstance(data, bytearray):
+            # indexing str and memoryview gives 1-char strings on Python 2
+            data = bytearray(data)
+        frames = []
+        pos = 0
+        size = len(data)
+        while pos < size:
+            if self.asdu is None:
+                bt = data[pos]
+                if bt == 255:
+                    pos += 1
+                    continue
+                try:
+                    self.create_asdu(bt)
+                except ParserException:
+                    if not self.resync:
+                        raise
+                    self.discarded_bytes += 1
+                    pos += 1
+                    continue
+            buffered = len(self.asdu.buffer)
+            try:
+                pos = self.asdu.extend(data, pos)
+            except ParserException as e:
+                if not self.resync:
+                    raise
+                # scan again all the bytes after the wrong init byte
+                pos += len(self.asdu.buffer) - buffered
+                data = self.asdu.buffer[1:] + data[pos:]
+                pos = 0
+                size = len(data)
+                self.asdu = None
+                self.discarded_bytes += 1
+                self.discarded_frames += 1
+                logger.warning("Discarded wrong frame: %s", e)
+                continue
+            if self.asdu.completed:
+                frames.append(self.asdu)
+                self.asdu = None
+        return frames
 
     def create_asdu(self, init_byte):
         if init_byte == FixedAsdu.INIT_BYTE:
@@ -31,15 +92,18 @@ class AsduParser:
             raise ParserException("Wrong Init Byte {}".format(init_byte))
 
 
-class FixedAsdu:
+class FixedAsdu(object):
     INIT_BYTE = 0x10
     END_BYTE = 0x16
     LENGTH = 6
+    # init byte, C, DER, checksum, end byte
+    FRAME = struct.Struct("<BBHBB")
+
+    __slots__ = ('buffer', 'c', 'der', 'checksum')
 
     def __init__(self):
         self.buffer = bytearray()
         self.c = Flags_CampoC()
-        self.c.asBytes = 0
         self.der = 0
         self.checksum = 0
 
@@ -53,6 +117,17 @@ class FixedAsdu:
             return True
         return False
 
+    def extend(self, data, pos=0):
+        """Take from data, starting at pos, the bytes missing in the frame.
+
+        :return: position of the first byte of data not consumed
+        """
+        end = pos + FixedAsdu.LENGTH - len(self.buffer)
+        self.buffer.extend(data[pos:end])
+        if self.completed:
+            self.parse()
+        return min(end, len(data))
+
     @property
     def completed(self):
         if len(self.buffer) == FixedAsdu.LENGTH:
@@ -68,28 +143,28 @@ class FixedAsdu:
         Fifth byte is checksum
         Sixth byte is "end" 0x16
         """
-        if self.buffer[0] != FixedAsdu.INIT_BYTE:
+        init_byte, c, self.der, self.checksum, end_byte = \
+            FixedAsdu.FRAME.unpack_from(self.buffer)
+        if init_byte != FixedAsdu.INIT_BYTE:
             raise ParserException()
-        self.c = Flags_CampoC()
-        self.c.asByte = self.buffer[1]
-        self.der = struct.unpack("H", self.buffer[2:4])[0]
-        self.checksum = self.buffer[4]
+        if end_byte != FixedAsdu.END_BYTE:
+            raise ParserException("wrong end byte")
+        self.c.asByte = c
         self.check_checksum()
 
     def check_checksum(self):
-        checksum = (self.buffer[1] + self.buffer[2] + self.buffer[3]) % 256
+        checksum = sum(self.buffer[1:4]) % 256
         if checksum != self.checksum:
             raise ParserException("wrong checksum")
 
     def generate(self):
-        del self.buffer[:]
-        self.buffer.append(FixedAsdu.INIT_BYTE)
-        self.buffer.append(self.c.asByte)
-        self.buffer.extend(struct.pack("H", self.der))
-        self.checksum = (self.buffer[1] + self.buffer[2]
-                         + self.buffer[3]) % 256
-        self.buffer.extend(struct.pack("B", self.checksum))
-        self.buffer.append(FixedAsdu.END_BYTE)
+        self.buffer = bytearray(FixedAsdu.LENGTH)
+        FixedAsdu.FRAME.pack_into(
+            self.buffer, 0, FixedAsdu.INIT_BYTE, self.c.asByte, self.der, 0,
+            FixedAsdu.END_BYTE
+        )
+        self.checksum = sum(self.buffer[1:4]) % 256
+        self.buffer[4] = self.checksum
 
     def __repr__(self):
         output = "----- FixedAsdu Begin -----\n"
@@ -104,16 +179,27 @@ class FixedAsdu:
         return output
 
 
-class VariableAsdu:
+class VariableAsdu(object):
     INIT_BYTE = 0x68
     END_BYTE = 0x16
     EXTRA_LENGTH = 6
+    # init byte, length, length, init byte, C, DER, type, variable structure
+    # qualifier, P/N + transmission cause, measure point address and
+    # register address
+    HEADER = struct.Struct("<BBBBBHBBBHB")
+    # checksum, end byte
+    TRAILER = struct.Struct("<BB")
+
+    __slots__ = (
+        'buffer', 'length', 'c', 'der', 'tipo', 'cualificador_ev', 'pn',
+        'causa_tm', 'dir_pm', 'dir_registro', 'data', '_content',
+        '_decode_pending', 'checksum'
+    )
 
     def __init__(self):
         self.buffer = bytearray()
         self.length = 0
         self.c = Flags_CampoC()
-        self.c.asBytes = 0
         self.der = 0
 
         self.tipo = 0
@@ -123,29 +209,63 @@ class VariableAsdu:
         self.dir_pm = 0
         self.dir_registro = 0
         self.data = bytearray()
-        self.content = None
+        self._content = None
+        self._decode_pending = False
         self.checksum = 0
 
     def append(self, bt):
         self.buffer.append(bt)
-        if len(self.buffer) == 2:
-            self.length = bt
+        if len(self.buffer) < 4:
+            return False
+        if len(self.buffer) == 4:
+            self.check_header()
 
-        if (
-            len(self.buffer) > 2
-            and (len(self.buffer) > self.length + VariableAsdu.EXTRA_LENGTH)
-        ):
+        if len(self.buffer) > self.length + VariableAsdu.EXTRA_LENGTH:
             raise ParserException("Wrong length in variable length ASDU")
 
-        if self.length != 0 and self.completed:
+        if self.completed:
             self.parse()
             return True
 
         return False
 
+    def extend(self, data, pos=0):
+        """Take from data, starting at pos, the bytes missing in the frame.
+
+        The 0x68 L L 0x68 start is read first to know how many bytes are
+        missing.
+
+        :return: position of the first byte of data not consumed
+        """
+        size = len(data)
+        if len(self.buffer) < 4:
+            end = pos + 4 - len(self.buffer)
+            self.buffer.extend(data[pos:end])
+            pos = min(end, size)
+            if len(self.buffer) < 4:
+                return pos
+            self.check_header()
+
+        end = pos + self.length + VariableAsdu.EXTRA_LENGTH - len(self.buffer)
+        self.buffer.extend(data[pos:end])
+        if self.completed:
+            self.parse()
+        return min(end, size)
+
+    def check_header(self):
+        """Checks the 0x68 L L 0x68 start of the frame and sets the length"""
+        self.length = self.buffer[1]
+        if (self.buffer[2] != self.length
+                or self.buffer[3] != VariableAsdu.INIT_BYTE):
+            raise ParserException("Wrong header in variable length ASDU")
+        # at least C, DER, type, qualifier, cause and addresses
+        if self.length < VariableAsdu.HEADER.size - 4:
+            raise ParserException("Wrong length in variable length ASDU")
+
     @property
     def completed(self):
-        return self.length + VariableAsdu.EXTRA_LENGTH == len(self.buffer)
+        return (len(self.buffer) >= 4 and
+                self.length + VariableAsdu.EXTRA_LENGTH == len(self.buffer))
 
     def parse(self):
         """
@@ -156,70 +276,97 @@ class VariableAsdu:
         Fifth byte is checksum
         Sixth byte is  "end" 0x16
         """
-        if self.buffer[0] != VariableAsdu.INIT_BYTE:
+        (init_byte, self.length, _, _, c, self.der, self.tipo,
+         self.cualificador_ev, pn_causa_tm, self.dir_pm,
+         self.dir_registro) = VariableAsdu.HEADER.unpack_from(self.buffer)
+        if init_byte != VariableAsdu.INIT_BYTE:
             raise ParserException()
-        self.length = self.buffer[1]
-        self.c.asByte = self.buffer[4]
-        self.der = struct.unpack("H", self.buffer[5:7])[0]
-        self.tipo = self.buffer[7]
-        self.cualificador_ev = self.buffer[8]
+        self.c.asByte = c
         # P/N + causa_tm (6 bits)
-        self.pn = (self.buffer[9] & 0x40) >> 6
-        self.causa_tm = self.buffer[9] & 0x3f
-        self.dir_pm = struct.unpack("H", self.buffer[10:12])[0]
-        self.dir_registro = self.buffer[12]
-        # data from byte 13 to length - 9
-        self.data = self.buffer[13:self.length + 4]
-        # TODO WE HAVE TO PARSE DATA TO THE CORRECT TYPE
-        if len(self.data):
-            self.content = AppAsduRegistry.types[self.tipo]()
-            self.content.from_hex(self.data, self.cualificador_ev)
-        self.checksum = self.buffer[self.length + 4]
-        if self.buffer[self.length + 5] != VariableAsdu.END_BYTE:
+        self.pn = (pn_causa_tm & 0x40) >> 6
+        self.causa_tm = pn_causa_tm & 0x3f
+        # data from byte 13 to length - 9, a view on the buffer (no copy)
+        self.data = memoryview(self.buffer)[13:self.length + 4]
+        # content is decoded the first time it is accessed
+        self._content = None
+        self._decode_pending = len(self.data) > 0
+        self.checksum, end_byte = VariableAsdu.TRAILER.unpack_from(
+            self.buffer, self.length + 4
+        )
+        if end_byte != VariableAsdu.END_BYTE:
             raise ParserException("wrong end byte")
         self.check_checksum()
 
+    @property
+    def content(self):
+        """Application ASDU of the frame.
+
+        On parsed frames the data is decoded the first time content is
+        accessed, frames that are only forwarded or stored never pay for it.
+        """
+        if self._decode_pending:
+            data = self.data
+            if six.PY2:
+                # the decoders index the data, indexing a memoryview gives
+                # 1-char strings on Python 2
+                data = bytearray(data)
+            self._content = AppAsduRegistry.decode_asdu(
+                self.tipo, data, self.cualificador_ev
+            )
+            self._decode_pending = False
+        return self._content
+
+    @content.setter
+    def content(self, content):
+        self._content = content
+        self._decode_pending = False
+
+    def __getstate__(self):
+        # a view on the buffer can't be pickled, it is rebuilt on load
+        state = dict(
+            (name, getattr(self, name)) for name in VariableAsdu.__slots__
+        )
+        if isinstance(self.data, memoryview):
+            state['data'] = None
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        if self.data is None:
+            self.data = memoryview(self.buffer)[13:self.length + 4]
+
     def check_checksum(self):
-        checksum = 0
-        for i in range(4, self.length + 4):
-            checksum += self.buffer[i]
-        checksum = checksum % 256
+        checksum = sum(self.buffer[4:self.length + 4]) % 256
 
         if checksum != self.checksum:
             raise ParserException("wrong checksum")
 
     def generate(self):
-        del self.buffer[:]
-
+        # TODO, THINK A BIT MORE ON THIS
         if self.content is None:
             self.length = len(self.data) + 9
+            payload = self.data
         else:
             self.length = self.content.length
-
-        self.buffer.append(VariableAsdu.INIT_BYTE)
-        self.buffer.extend(struct.pack("B", self.length))
-        self.buffer.extend(struct.pack("B", self.length))
-        self.buffer.append(VariableAsdu.INIT_BYTE)
-        self.buffer.append(self.c.asByte)
-        self.buffer.extend(struct.pack("H", self.der))
-        if self.content is not None:
             self.tipo = self.content.type
-        self.buffer.extend(struct.pack("B", self.tipo))
-        self.buffer.extend(struct.pack("B", self.cualificador_ev))
-        self.buffer.extend(struct.pack("B", self.causa_tm))
-        self.buffer.extend(struct.pack("H", self.dir_pm))
-        self.buffer.extend(struct.pack("B", self.dir_registro))
-        # TODO, THINK A BIT MORE ON THIS
-        if self.content is None:
-            self.buffer.extend(self.data)
-        else:
-            self.buffer.extend(self.content.to_bytes())
-        self.checksum = 0
-        for i in range(4, self.length + 4):
-            self.checksum += self.buffer[i]
-        self.checksum = self.checksum % 256
-        self.buffer.extend(struct.pack("B", self.checksum))
-        self.buffer.append(VariableAsdu.END_BYTE)
+            payload = self.content.to_bytes()
+
+        header_length = VariableAsdu.HEADER.size
+        end = header_length + len(payload)
+        # a new buffer, data may be a view on the current one
+        self.buffer = bytearray(end + VariableAsdu.TRAILER.size)
+        VariableAsdu.HEADER.pack_into(
+            self.buffer, 0, VariableAsdu.INIT_BYTE, self.length, self.length,
+            VariableAsdu.INIT_BYTE, self.c.asByte, self.der, self.tipo,
+            self.cualificador_ev, self.causa_tm, self.dir_pm,
+            self.dir_registro
+        )
+        self.buffer[header_length:end] = payload
+        self.checksum = sum(self.buffer[4:end]) % 256
+        VariableAsdu.TRAILER.pack_into(
+            self.buffer, end, self.checksum, VariableAsdu.END_BYTE
+        )
 
     def __repr__(self):
         output = "----- VariableAsdu Begin -----\n"
@@ -233,7 +380,7 @@ class VariableAsdu:
         output += " causa transmision: " + str(self.causa_tm) + " " + hex(self.causa_tm) + " P/N: " + str(self.pn) + "\n"
         output += " direccion punto medida: " + str(self.dir_pm) + "\n"
         output += " direccion registro: " + str(self.dir_registro) + "\n"
-        output += " CONTENIDO: " + (":".join("%02x" % b for b in self.data)) + "\n"
+        output += " CONTENIDO: " + (":".join("%02x" % b for b in bytearray(self.data))) + "\n"
         output += str(self.content) + "\n"
         output += " checksum: " + str(self.checksum) + " " +hex(self.checksum) +  "\n"
         output += " " + (":".join("%02x" % b for b in self.buffer)) + "\n"
@@ -241,22 +388,96 @@ class VariableAsdu:
         return output
         
 
-c_uint8 = ctypes.c_uint8
-
-
-class Flags_CampoC_bits(ctypes.BigEndianStructure):
-    _fields_ = [
-        ("res", c_uint8, 1),
-        ("prm", c_uint8, 1),
-        ("fcb", c_uint8, 1),
-        ("fcv", c_uint8, 1),
-        ("cf", c_uint8, 4)
-    ]
-
-
-class Flags_CampoC(ctypes.Union):
-    _fields_ = [
-        ("b", Flags_CampoC_bits),
-        ("asByte", c_uint8)
-    ]
-    _anonymous_ = ("b")
+# FCB bit of the C field
+FCB_MASK = 0x20
+
+
+class RequestTemplate(object):
+    """Header of the request frames that only differ in FCB and payload.
+
+    The header is packed once with the FCB bit cleared, stamp() copies it,
+    sets the FCB, appends the payload and completes the checksum from the
+    precomputed sum of the header.
+    """
+
+    __slots__ = ('c', 'der', 'tipo', 'cualificador_ev', 'causa_tm',
+                 'dir_pm', 'dir_registro', 'length', 'header', 'header_sum')
+
+    def __init__(self, c, der, tipo, cualificador_ev, causa_tm, dir_pm,
+                 dir_registro, length):
+        self.c = c & ~FCB_MASK
+        self.der = der
+        self.tipo = tipo
+        self.cualificador_ev = cualificador_ev
+        self.causa_tm = causa_tm
+        self.dir_pm = dir_pm
+        self.dir_registro = dir_registro
+        self.length = length
+        self.header = VariableAsdu.HEADER.pack(
+            VariableAsdu.INIT_BYTE, length, length, VariableAsdu.INIT_BYTE,
+            self.c, der, tipo, cualificador_ev, causa_tm, dir_pm,
+            dir_registro
+        )
+        self.header_sum = sum(bytearray(self.header[4:]))
+
+    def stamp(self, fcb, payload, content=None):
+        """VariableAsdu with the given FCB bit and payload bytes
+
+        :param content: app ASDU of the payload, set as the frame content
+        """
+        header_length = VariableAsdu.HEADER.size
+        end = header_length + len(payload)
+        buffer = bytearray(end + VariableAsdu.TRAILER.size)
+        buffer[:header_length] = self.header
+        buffer[header_length:end] = payload
+        c = self.c
+        if fcb:
+            c |= FCB_MASK
+            buffer[4] = c
+        checksum = (
+            self.header_sum + (c & FCB_MASK)
+            + sum(buffer[header_length:end])
+        ) % 256
+        VariableAsdu.TRAILER.pack_into(
+            buffer, end, checksum, VariableAsdu.END_BYTE
+        )
+
+        asdu = VariableAsdu()
+        asdu.buffer = buffer
+        asdu.length = self.length
+        asdu.c.asByte = c
+        asdu.der = self.der
+        asdu.tipo = self.tipo
+        asdu.cualificador_ev = self.cualificador_ev
+        asdu.causa_tm = self.causa_tm
+        asdu.dir_pm = self.dir_pm
+        asdu.dir_registro = self.dir_registro
+        asdu.content = content
+        asdu.checksum = checksum
+        return asdu
+
+
+def _c_bits(shift, mask):
+    def getter(self):
+        return (self.asByte >> shift) & mask
+
+    def setter(self, value):
+        self.asByte = (
+            (self.asByte & ~(mask << shift)) | ((value & mask) << shift)
+        )
+    return property(getter, setter)
+
+
+class Flags_CampoC(object):
+    """C field, RES - PRM - FCB - FCV - function code from the high bit"""
+
+    __slots__ = ('asByte',)
+
+    res = _c_bits(7, 0x01)
+    prm = _c_bits(6, 0x01)
+    fcb = _c_bits(5, 0x01)
+    fcv = _c_bits(4, 0x01)
+    cf = _c_bits(0, 0x0f)
+
+    def __init__(self, asByte=0):
+        self.asByte = asByte
@@ -0,0 +1,174 @@
+"""Offline decoding of frame capture files
+
+A capture file is either raw, the received bytes as they came from the
+physical layer, or hex, text with the frames written as hex bytes
+(optionally separated by spaces or ':'), one or more frames per line and
+no frame split across lines.
+
+The file is memory-mapped, split in chunks that end at frame boundaries
+(line ends for hex files) and the chunks are decoded in a process pool.
+"""
+from __future__ import absolute_import
+import binascii
+import logging
+import mmap
+import multiprocessing
+import os
+import six
+from .base_asdu import AsduParser, FixedAsdu, VariableAsdu
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+HEX_SEPARATORS = b' \t\r\n:'
+
+
+def frame_length(data, pos, size):
+    """Length of the frame starting at pos, 0 when the bytes at pos are not
+    the header, end byte and checksum of a frame.
+
+    :param data: bytes, mmap or any object indexed by position
+    """
+    bt = six.indexbytes(data, pos)
+    if bt == FixedAsdu.INIT_BYTE:
+        length = FixedAsdu.LENGTH
+        if (pos + length <= size
+                and six.indexbytes(data, pos + 5) == FixedAsdu.END_BYTE
+                and sum(bytearray(data[pos + 1:pos + 4])) % 256
+                == six.indexbytes(data, pos + 4)):
+            return length
+    elif bt == VariableAsdu.INIT_BYTE and pos + 4 <= size:
+        length = six.indexbytes(data, pos + 1)
+        end = pos + length + 4
+        if (six.indexbytes(data, pos + 2) == length
+                and six.indexbytes(data, pos + 3) == VariableAsdu.INIT_BYTE
+                and end + 2 <= size
+                and six.indexbytes(data, end + 1) == VariableAsdu.END_BYTE
+                and sum(bytearray(data[pos + 4:end])) % 256
+                == six.indexbytes(data, end)):
+            return length + VariableAsdu.EXTRA_LENGTH
+    return 0
+
+
+def frame_boundaries(data, chunk_size=CHUNK_SIZE):
+    """Splits raw frame bytes in ranges that start and end at a frame.
+
+    Frames are skipped using their length once their end byte and checksum
+    are checked, without decoding them. Any other byte only moves one byte
+    forward, so a stray init byte can't put a boundary inside a frame.
+
+    :param data: bytes, mmap or any object indexed by position
+    :return: list of (start, end) ranges of about chunk_size bytes
+    """
+    size = len(data)
+    ranges = []
+    start = pos = 0
+    while pos < size:
+        pos += frame_length(data, pos, size) or 1
+        if pos - start >= chunk_size:
+            ranges.append((start, pos))
+            start = pos
+    if start < size:
+        ranges.append((start, size))
+    return ranges
+
+
+def line_boundaries(data, chunk_size=CHUNK_SIZE):
+    """Splits hex text in ranges that end at a line end.
+
+    :param data: bytes or mmap
+    :return: list of (start, end) ranges of about chunk_size bytes
+    """
+    size = len(data)
+    ranges = []
+    start = 0
+    while start < size:
+        end = data.find(b'\n', min(start + chunk_size, size) - 1)
+        end = size if end < 0 else end + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def decode_chunk(chunk, is_hex=False, decode=True):
+    """Parses the frames of a chunk of a capture file.
+
+    :param chunk: raw bytes, or hex text when is_hex
+    :param decode: decode the content of the variable frames now
+    :return: list of FixedAsdu and VariableAsdu frames
+    """
+    if is_hex:
+        chunk = binascii.unhexlify(chunk.translate(None, HEX_SEPARATORS))
+    parser = AsduParser(resync=True)
+    frames = parser.feed(bytearray(chunk))
+    if parser.asdu is not None:
+        logger.warning("Capture chunk ends with an incomplete frame")
+    if parser.discarded_bytes:
+        logger.warning(
+            "Discarded %s bytes and %s frames", parser.discarded_bytes,
+            parser.discarded_frames
+        )
+    if decode:
+        for frame in frames:
+            if isinstance(frame, VariableAsdu):
+                try:
+                    frame.content
+                except Exception as e:
+                    # left undecoded, it fails again when content is read
+                    logger.warning("Can't decode frame type %s: %s",
+                                   frame.tipo, e)
+    return frames
+
+
+def _decode_range(task):
+    path, start, end, is_hex, decode = task
+    with open(path, 'rb') as capture:
+        data = mmap.mmap(capture.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            chunk = data[start:end]
+        finally:
+            data.close()
+    return decode_chunk(chunk, is_hex, decode)
+
+
+def read_capture(path, is_hex=False, processes=None, chunk_size=CHUNK_SIZE,
+                 decode=True):
+    """Yields the frames of a capture file, in file order.
+
+    :param path: capture file path
+    :param is_hex: the file has hex text instead of raw bytes
+    :param processes: size of the process pool, None for the number of
+        cpus and 1 to decode in the current process
+    :param chunk_size: approximate size of the chunk decoded by a process
+    :param decode: decode the content of the variable frames in the pool
+    """
+    if not os.path.getsize(path):
+        return
+    with open(path, 'rb') as capture:
+        data = mmap.mmap(capture.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if is_hex:
+                ranges = line_boundaries(data, chunk_size)
+            else:
+                ranges = frame_boundaries(data, chunk_size)
+        finally:
+            data.close()
+    tasks = [(path, start, end, is_hex, decode) for start, end in ranges]
+
+    if processes == 1 or len(tasks) == 1:
+        for task in tasks:
+            for frame in _decode_range(task):
+                yield frame
+        return
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        for frames in pool.imap(_decode_range, tasks):
+            for frame in frames:
+                yield frame
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,80 @@
+"""Columnar integrated totals
+
+Accumulates the values of M_IT_TG_2(8), M_IT_TK_2(11) and M_IB_TK_2(140)
+responses in parallel arrays (address, total, quality and epoch) instead
+of one IntegratedTotals namedtuple with a localized datetime per value.
+"""
+from __future__ import absolute_import
+import calendar
+from array import array
+from .app_asdu import (
+    M_IT_TX_2, M_IT_TG_2, M_IT_TK_2, cp40_datetime, iter_records
+)
+
+try:
+    EPOCH_TYPECODE = array('q').typecode
+except ValueError:
+    # python 2 has no 'q', 'l' is 64 bits on LP64 platforms
+    EPOCH_TYPECODE = 'l'
+
+
+def epoch(fecha):
+    """Epoch seconds of an aware datetime"""
+    return calendar.timegm(fecha.utctimetuple())
+
+
+class IntegratedTotalsColumns(object):
+    """Parallel arrays with the integrated totals of a read"""
+
+    def __init__(self):
+        self.address = array('B')
+        self.total = array('I')
+        self.quality = array('B')
+        self.epoch = array(EPOCH_TYPECODE)
+
+    def __len__(self):
+        return len(self.total)
+
+    def append_asdu(self, asdu):
+        """Append the values of a VariableAsdu.
+
+        M_IT_TG_2 and M_IT_TK_2 records are read from the raw frame data,
+        the content is not decoded. Other types are taken from the decoded
+        content valores.
+        """
+        if asdu.tipo in (M_IT_TG_2.type, M_IT_TK_2.type):
+            count = asdu.cualificador_ev
+            timestamp = epoch(
+                cp40_datetime(asdu.data, count * M_IT_TX_2.RECORD.size)
+            )
+            for address, total, quality in iter_records(
+                    M_IT_TX_2.RECORD, asdu.data, count):
+                self.address.append(address)
+                self.total.append(total)
+                self.quality.append(quality)
+            self.epoch.extend([timestamp] * count)
+        else:
+            for value in asdu.content.valores:
+                self.address.append(value.address)
+                self.total.append(value.total)
+                self.quality.append(value.quality)
+                self.epoch.append(epoch(value.datetime))
+
+    def extend(self, asdus):
+        for asdu in asdus:
+            self.append_asdu(asdu)
+        return self
+
+    def to_numpy(self):
+        """Dict of numpy arrays, numpy is only required by this method"""
+        import numpy
+        return {
+            'address': numpy.frombuffer(self.address, dtype=numpy.uint8),
+            'total': numpy.frombuffer(
+                self.total, dtype='u{}'.format(self.total.itemsize)
+            ),
+            'quality': numpy.frombuffer(self.quality, dtype=numpy.uint8),
+            'epoch': numpy.frombuffer(
+                self.epoch, dtype='i{}'.format(self.epoch.itemsize)
+            ),
+        }
@@ -0,0 +1,138 @@
+"""Timezone transition tables
+
+DstTable flattens the UTC transitions of a pytz timezone to lists of
+epoch seconds, so converting between local fields, the IEC SU (summer
+time) flag and UTC epoch is a bisect over the table. pytz is only used
+to build the table, the tzinfo instances it returns are the pytz ones
+and its results are the same as pytz localize. The table is read from
+pytz internals, when a timezone doesn't have them the conversions are
+done by the timezone itself.
+"""
+from __future__ import absolute_import
+import calendar
+import datetime
+from bisect import bisect_right
+from pytz import timezone
+
+
+HOUR = 3600
+DAY = 24 * HOUR
+# pytz moves non-existent times this far to resolve them
+GAP_SHIFT = 6 * HOUR
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _seconds(delta):
+    return delta.days * DAY + delta.seconds
+
+
+class DstTable(object):
+    """UTC offsets and DST flags of a timezone by transition"""
+
+    def __init__(self, tz):
+        """:param tz: pytz timezone or its name"""
+        if not hasattr(tz, 'localize'):
+            tz = timezone(tz)
+        self.tz = tz
+        transitions = getattr(tz, '_utc_transition_times', None)
+        transition_info = getattr(tz, '_transition_info', None)
+        tzinfos = getattr(tz, '_tzinfos', None)
+        if transitions and transition_info and tzinfos:
+            self.transitions = [
+                calendar.timegm(t.timetuple()) for t in transitions
+            ]
+            self.tzinfos = [tzinfos[info] for info in transition_info]
+            self.offsets = [
+                _seconds(offset) for offset, _, _ in transition_info
+            ]
+            self.dsts = [bool(dst) for _, dst, _ in transition_info]
+        elif tz.utcoffset(None) is not None:
+            # static timezone, one offset forever
+            self.transitions = [float('-inf')]
+            self.tzinfos = [tz]
+            self.offsets = [_seconds(tz.utcoffset(EPOCH))]
+            self.dsts = [False]
+        else:
+            # transitions unknown, tz does the conversions
+            self.transitions = None
+
+    def index(self, epoch):
+        """Position of the transition in effect at epoch seconds"""
+        return max(0, bisect_right(self.transitions, epoch) - 1)
+
+    def _utc_index(self, local, is_dst):
+        # candidates as pytz localize, trying the offsets in effect a day
+        # before and after
+        candidates = {}
+        for shifted in (local - DAY, local + DAY):
+            offset = self.offsets[self.index(shifted)]
+            position = self.index(local - offset)
+            if self.offsets[position] == offset:
+                candidates[local - offset] = position
+        if len(candidates) == 1:
+            return candidates.popitem()
+        if not candidates:
+            # non-existent time, resolved from one side of the gap
+            if is_dst:
+                utc, position = self._utc_index(local + GAP_SHIFT, True)
+                return utc - GAP_SHIFT, position
+            utc, position = self._utc_index(local - GAP_SHIFT, False)
+            return utc + GAP_SHIFT, position
+        # ambiguous time
+        matching = [
+            (utc, position) for utc, position in candidates.items()
+            if self.dsts[position] == bool(is_dst)
+        ] or list(candidates.items())
+        return (min if is_dst else max)(matching)
+
+    def localize(self, dt, is_dst=False):
+        """Same as the pytz localize of a naive datetime"""
+        if dt.tzinfo is not None:
+            raise ValueError('Not naive datetime (tzinfo is already set)')
+        if self.transitions is None:
+            return self.tz.localize(dt, is_dst=is_dst)
+        local = calendar.timegm(dt.timetuple())
+        _, position = self._utc_index(local, is_dst)
+        return dt.replace(tzinfo=self.tzinfos[position])
+
+    def to_epoch(self, dt, is_dst=False):
+        """UTC epoch seconds of a naive local datetime"""
+        if dt.tzinfo is not None:
+            raise ValueError('Not naive datetime (tzinfo is already set)')
+        if self.transitions is None:
+            utc = calendar.timegm(
+                self.tz.localize(dt, is_dst=is_dst).utctimetuple()
+            )
+            return utc + dt.microsecond / 1000000.0
+        local = calendar.timegm(dt.timetuple())
+        utc, position = self._utc_index(local, is_dst)
+        return utc + dt.microsecond / 1000000.0
+
+    def from_epoch(self, epoch):
+        """Aware local datetime of UTC epoch seconds"""
+        if self.transitions is None:
+            return datetime.datetime.fromtimestamp(epoch, self.tz)
+        position = self.index(epoch)
+        local = EPOCH + datetime.timedelta(
+            seconds=epoch + self.offsets[position]
+        )
+        return local.replace(tzinfo=self.tzinfos[position])
+
+    def is_dst(self, epoch):
+        """Summer time flag at UTC epoch seconds"""
+        if self.transitions is None:
+            return bool(self.from_epoch(epoch).dst())
+        return self.dsts[self.index(epoch)]
+
+
+_TABLES = {}
+
+
+def get_table(tz):
+    """Shared DstTable of a timezone or timezone name"""
+    key = getattr(tz, 'zone', tz)
+    table = _TABLES.get(key)
+    if table is None:
+        table = _TABLES[key] = DstTable(tz)
+    return table
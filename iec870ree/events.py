@@ -1,4 +1,7 @@
 # -*- coding: utf-8 -*-
+from collections import namedtuple
+from six.moves import intern
+
 #{ 'SPA1': {'SPQ1': {'description': 'blabla', 'SPI': False, 'register': 52},
 #           'SPQ2': {'description': '{SPI} bleble', 'SPI': ('perdida', 'recuperación'), 'register': 52},
 #            ...
@@ -187,23 +190,55 @@ TM_EVENTS_DICT = {
 }
 
 
+EventInfo = namedtuple('EventInfo', ['description', 'register'])
+
+UNKNOWN_SPA_EVENT = EventInfo(
+    'Código de error interno, dependiente del fabricante', None
+)
+UNKNOWN_SPQ_EVENT = EventInfo('Código de error desconocido', None)
+
+
+def build_events_index(events):
+    """
+    Flattens an events dict like TM_EVENTS_DICT
+    :param events: {SPA: {SPQ: {'spi', 'register', 'description'}}}
+    :return: dict (SPA, SPQ, SPI) -> EventInfo with interned descriptions
+    """
+    index = {}
+    for spa, spqs in events.items():
+        for spq, ev_data in spqs.items():
+            tmpl = ev_data.get('description')
+            for spi in (0, 1):
+                if ev_data.get('spi', False):
+                    txt = tmpl.format(ev_data.get('spi')[spi])
+                else:
+                    txt = tmpl
+                index[(spa, spq, spi)] = EventInfo(
+                    intern(txt), ev_data.get('register')
+                )
+    return index
+
+
+TM_EVENTS_INDEX = build_events_index(TM_EVENTS_DICT)
+
+
+def classify_event(SPA, SPQ, SPI):
+    '''
+    Description and register of an event
+    :return: EventInfo named tuple (description, register)
+    '''
+    info = TM_EVENTS_INDEX.get((SPA, SPQ, SPI))
+    if info is None:
+        if not TM_EVENTS_DICT.get(SPA, False):
+            return UNKNOWN_SPA_EVENT
+        return UNKNOWN_SPQ_EVENT
+    return info
+
+
 def get_event_description(event):
     '''
     Gets SingleEvent structure and returns text
-    :param event: SingleEvent named tuple (SPA, SPQ, SPI, date)
+    :param event: SingleEvent or EventRecord named tuple (SPA, SPQ, SPI, date)
     :return: text
     '''
-    if not TM_EVENTS_DICT.get(event.SPA, False):
-        txt = 'Código de error interno, dependiente del fabricante'
-    else:
-        ev_data = TM_EVENTS_DICT[event.SPA].get(event.SPQ)
-        if ev_data:
-            tmpl = ev_data.get('description')
-            if ev_data.get('spi', False):
-                txt = tmpl.format(ev_data.get('spi')[event.SPI])
-            else:
-                txt = tmpl
-        else:
-            txt = 'Código de error desconocido'
-
-    return txt
\ No newline at end of file
+    return classify_event(event.SPA, event.SPQ, event.SPI).description
@@ -16,21 +16,39 @@ from .protocol import PhysicalLayer
 
 logger = logging.getLogger(__name__)
 
+# Initial size of the receive ring buffer, it grows when the bytes are not
+# read fast enough
+BUFFER_SIZE = 65536
+
 
 class Ip(PhysicalLayer):
     """IP Physical Layer"""
 
-    def __init__(self, addr, waiting=5):
+    def __init__(self, addr, waiting=5, quiet_period=None):
         """Create an IP Physical Layer.
         :addr tuple: Address tuple (host, port)
+        :waiting: seconds to wait after connecting. Use 0 and
+            LinkLayer.wait_ready to send frames as soon as the meter answers
+        :quiet_period: wait after connecting until nothing is received for
+            these seconds, at most `waiting`. The bytes received until then
+            (modem banners) are discarded.
         """
         self.addr = addr
         self.connection = None
         self.connected = False
         self.alive = threading.Event()
-        self.queue = queue.Queue()
+        # Ring buffer with the received bytes: `count` bytes starting at
+        # `head`. The reading thread receives straight into the free space
+        # and only takes the lock to update the positions.
+        self.buffer = bytearray(BUFFER_SIZE)
+        self.head = 0
+        self.count = 0
+        self.closed = False
+        self.ready = threading.Condition()
         self.thread = threading.Thread(target=self.read_port)
         self.waiting = waiting
+        self.quiet_period = quiet_period
+        self.last_received = None
         logger.debug("New IP with addr %s", addr)
 
     def connect(self):
@@ -39,10 +57,32 @@ class Ip(PhysicalLayer):
         self.connection = socket.create_connection(self.addr)
         self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         self.connected = True
+        self.closed = False
+        self.last_received = time.time()
         self.alive.set()
         self.thread.start()
         logger.debug("Connection with %s created, wait %s", self.addr, self.waiting)
-        time.sleep(self.waiting)
+        if self.quiet_period is not None:
+            self.wait_quiet(self.quiet_period, self.waiting)
+        elif self.waiting:
+            time.sleep(self.waiting)
+
+    def wait_quiet(self, quiet_period, max_wait):
+        """Wait until nothing is received for quiet_period seconds or
+        max_wait is reached, and discard the received bytes"""
+        deadline = time.time() + max_wait
+        with self.ready:
+            while not self.closed:
+                now = time.time()
+                quiet_until = self.last_received + quiet_period
+                if now >= quiet_until or now >= deadline:
+                    break
+                self.ready.wait(min(quiet_until, deadline) - now)
+            if self.count:
+                banner = self.take(self.count)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Discarding %s from %s",
+                                 binascii.hexlify(banner), self.addr)
 
     def disconnect(self):
         """Disconnects
@@ -61,23 +101,71 @@ class Ip(PhysicalLayer):
         logger.debug("Start reading port for %s", self.addr)
         self.connection.settimeout(10.0)
         while self.alive.is_set():
+            free = self.free_space()
             try:
-                response = self.connection.recv(16)
+                size = self.connection.recv_into(free)
             except socket.timeout as e:
                 continue
             except Exception as e:
                 continue
-            if not response:
-                continue
-            logger.debug(
-                "<= Reading %s from %s",
-                binascii.hexlify(response),
-                self.addr
-            )
-            for byte_resp in response:
-                self.queue.put(byte_resp)
+            if not size:
+                logger.debug("Connection closed by %s", self.addr)
+                break
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "<= Reading %s from %s",
+                    binascii.hexlify(free[:size]),
+                    self.addr
+                )
+            with self.ready:
+                self.count += size
+                self.last_received = time.time()
+                self.ready.notify_all()
         logger.debug("Stopping reading port for %s", self.addr)
-        self.queue.put(None)
+        with self.ready:
+            self.closed = True
+            self.ready.notify_all()
+
+    def free_space(self):
+        """Memoryview of the contiguous free space after the buffered bytes,
+        the buffer is doubled when it is full"""
+        with self.ready:
+            size = len(self.buffer)
+            if self.count == size:
+                self.buffer = self.take(self.count) + bytearray(size)
+                self.head = 0
+                self.count = size
+                size *= 2
+            tail = (self.head + self.count) % size
+            end = size if tail >= self.head else self.head
+            return memoryview(self.buffer)[tail:end]
+
+    def take(self, n):
+        """Remove n bytes from the ring buffer, the lock must be held"""
+        size = len(self.buffer)
+        end = self.head + n
+        if end <= size:
+            data = self.buffer[self.head:end]
+        else:
+            data = self.buffer[self.head:] + self.buffer[:end - size]
+        self.head = end % size
+        self.count -= n
+        return data
+
+    def wait_bytes(self, n, timeout):
+        """Wait until there are n bytes buffered or the connection is closed,
+        the lock must be held
+
+        :raises queue.Empty: when the timeout expires
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while self.count < n and not self.closed:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise queue.Empty
+            self.ready.wait(remaining)
 
     def send_byte(self, byte):
         """Send a byte"""
@@ -87,10 +175,36 @@ class Ip(PhysicalLayer):
 
     def send_bytes(self, bts):
         assert isinstance(self.connection, socket.socket)
-        logger.debug("=> Sending %s to %s", binascii.hexlify(bts), self.addr)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("=> Sending %s to %s", binascii.hexlify(bts),
+                         self.addr)
         self.connection.send(bts)
 
+    def get_bytes(self, n, timeout=60):
+        """Read n bytes.
+
+        :return: bytearray, shorter than n when the connection is closed or
+            None if there are no bytes left
+        :raises queue.Empty: when the bytes are not received in time
+        """
+        with self.ready:
+            self.wait_bytes(n, timeout)
+            if not self.count:
+                return None
+            return self.take(min(n, self.count))
+
+    def read_available(self, timeout=60):
+        """Read all the buffered bytes, waiting for at least one"""
+        with self.ready:
+            self.wait_bytes(1, timeout)
+            if not self.count:
+                return None
+            return self.take(self.count)
+
     def get_byte(self, timeout=60):
         """Read a byte"""
-        logger.debug("Getting byte. waiting {}".format(timeout))
-        return self.queue.get(True, timeout=timeout)
+        logger.debug("Getting byte. waiting %s", timeout)
+        data = self.get_bytes(1, timeout)
+        if data is None:
+            return None
+        return data[0]
@@ -1,4 +1,4 @@
-from .protocol import PhysicalLayer
+from .protocol import PhysicalLayer, hexdump
 import threading
 import six
 if six.PY2:
@@ -39,14 +39,14 @@ class Modem(PhysicalLayer):
     def connect_port(self):
         max_tries = 20
         for i in range(max_tries):
-            logger.info("try open port {}".format(i))
+            logger.info("try open port %s", i)
             try:
                 self.sport = serial.Serial(self.serial_port, baudrate=9600,
                                            timeout=1)
-                logger.info("serial port {} opened".format(self.serial_port))
+                logger.info("serial port %s opened", self.serial_port)
                 break
             except serial.serialutil.SerialException as ex:
-                logger.warning("error connectiong {}".format(ex))
+                logger.warning("error connectiong %s", ex)
                 time.sleep(1)
                 if (i >= max_tries or "Permission" not in str(ex)):
                     raise ex
@@ -73,7 +73,7 @@ class Modem(PhysicalLayer):
         for i in range(max_tries):
             try:
                 i = self.queue.get(False, 1)
-                logger.info("got message> " + i)
+                logger.info("got message> %s", i)
                 for word in Modem.CONNECTED_WORDS:
                     if word in i:
                         logger.info("CONNECTED!!!!!!!!!!!!!!!!!!!!")
@@ -120,7 +120,7 @@ class Modem(PhysicalLayer):
         return self.queue.get(True, timeout)
 
     def writeat(self, value):
-        logger.info("sending command " + value)
+        logger.info("sending command %s", value)
         if isinstance(value, six.text_type):
             to_write = (value + u"\r").encode("ascii")
         else:
@@ -130,7 +130,8 @@ class Modem(PhysicalLayer):
     def write(self, value):
         if not self.connected:
             raise ModemException("modem not connected")
-        logger.debug("->" + ":".join("%02x" % b for b in bytearray(value)))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("->%s", hexdump(value))
         self.sport.write(value)
 
     def read_port(self, read_queue):
@@ -141,7 +142,8 @@ class Modem(PhysicalLayer):
             response = self.sport.read(1)
             if not response:
                 continue
-            logger.debug("<-" + ":".join("%02x" % b for b in bytearray(response)))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("<-%s", hexdump(response))
 
             for b in response:
                 # if not self.data_mode and (b == 0x0A or b == 0x0D):
@@ -149,7 +151,7 @@ class Modem(PhysicalLayer):
                     # answer with the line
                     buffer.append(b)
                     if (b == 0x0A):
-                        logger.info("R-" + buffer.decode("ascii"))
+                        logger.info("R-%s", buffer.decode("ascii"))
                         read_queue.put(buffer.decode("ascii"))
                         del buffer[:]
                 else:
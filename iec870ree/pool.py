@@ -0,0 +1,195 @@
+"""Pool of authenticated sessions with IP meters
+
+Opening a session takes the TCP connection, the link state request, the
+remote link reposition and the authentication. The pool keeps the
+sessions open after a read so the next read of the same meter skips all
+of it, while the session is not older than the content timeout.
+"""
+from __future__ import absolute_import
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from .ip import Ip
+from .protocol import AppLayer, LinkLayer
+
+
+logger = logging.getLogger(__name__)
+
+
+class Session(object):
+    """Authenticated session with a meter, reads are done with app_layer"""
+
+    def __init__(self, key, physical_layer, link_layer, app_layer):
+        self.key = key
+        self.physical_layer = physical_layer
+        self.link_layer = link_layer
+        self.app_layer = app_layer
+        # time.time() of the last release to the pool
+        self.released = None
+
+    @property
+    def in_request(self):
+        """A read was left before its last answer, the next frames of the
+        meter would be taken as the answers to the next request"""
+        return self.app_layer.in_request
+
+    @property
+    def closed(self):
+        return (not self.physical_layer.connected
+                or getattr(self.physical_layer, 'closed', False))
+
+    def expired(self, now):
+        """The meter may have ended the session after max_content_timeout
+        seconds without requests"""
+        return now - self.released > self.app_layer.max_content_timeout
+
+    def close(self, finish=True):
+        """Finish the session and disconnect. The session is not finished
+        when finish is False or a read is not finished, the meter may have
+        ended it already or the answers of the read would be taken as the
+        ones of the finish request"""
+        try:
+            if finish and not self.closed and not self.in_request:
+                self.app_layer.finish_session()
+        finally:
+            self.physical_layer.disconnect()
+        logger.debug("Session %s closed", self.key[:4])
+
+
+class SessionPool(object):
+    """Sessions by (host, port, der, dir_pm, clave_pm).
+
+        pool = SessionPool()
+        with pool.session(host, port, der, dir_pm, clave_pm) as app_layer:
+            for resp in app_layer.read_events():
+                ...
+        pool.close()
+    """
+
+    def __init__(self, content_timeout=300, max_wait=5):
+        """
+        :param content_timeout: content timeout of the AppLayer, idle
+            sessions are not reused after it
+        :param max_wait: maximum wait for the first answer of the meter,
+            see LinkLayer.wait_ready
+        """
+        self.content_timeout = content_timeout
+        self.max_wait = max_wait
+        self.idle = {}
+        self.lock = threading.Lock()
+        # threads disconnecting the expired sessions
+        self.closers = []
+
+    def acquire(self, host, port, der, dir_pm, clave_pm):
+        """Take an idle session of the meter or open a new one"""
+        key = (host, port, der, dir_pm, clave_pm)
+        now = time.time()
+        session = None
+        expired = []
+        with self.lock:
+            sessions = self.idle.get(key, [])
+            while sessions and session is None:
+                session = sessions.pop()
+                if session.closed or session.expired(now):
+                    expired.append(session)
+                    session = None
+        if expired:
+            self.close_later(expired)
+        if session is None:
+            return self.open(key)
+        logger.debug("Reusing session %s", key[:4])
+        session.link_layer.reset_parser()
+        session.app_layer.reset_content_received()
+        return session
+
+    def release(self, session):
+        """Return a session to the pool, closed sessions and sessions with
+        a read not finished are dropped"""
+        if session.closed or session.in_request:
+            self.discard(session)
+            return
+        session.released = time.time()
+        with self.lock:
+            self.idle.setdefault(session.key, []).append(session)
+
+    def discard(self, session, finish=True):
+        """Close a session that can't be reused"""
+        try:
+            session.close(finish)
+        except Exception as e:
+            logger.info("Error closing session %s: %s", session.key[:4], e)
+
+    def close_later(self, sessions):
+        """Disconnect expired sessions in a thread, without finishing them,
+        so acquire doesn't wait for it"""
+        def disconnect():
+            for session in sessions:
+                self.discard(session, finish=False)
+
+        thread = threading.Thread(target=disconnect)
+        thread.daemon = True
+        with self.lock:
+            self.closers = [
+                closer for closer in self.closers if closer.is_alive()
+            ]
+            self.closers.append(thread)
+            thread.start()
+
+    @contextmanager
+    def session(self, host, port, der, dir_pm, clave_pm):
+        """Context manager with the AppLayer of a session, the session is
+        discarded when the block raises or leaves a read not finished"""
+        session = self.acquire(host, port, der, dir_pm, clave_pm)
+        try:
+            yield session.app_layer
+        except Exception:
+            self.discard(session)
+            raise
+        self.release(session)
+
+    def open(self, key):
+        host, port, der, dir_pm, clave_pm = key
+        physical_layer = self.create_physical_layer(host, port)
+        link_layer = LinkLayer(der, dir_pm)
+        link_layer.initialize(physical_layer)
+        app_layer = AppLayer()
+        app_layer.set_content_timeout(self.content_timeout)
+        app_layer.initialize(link_layer)
+        session = Session(key, physical_layer, link_layer, app_layer)
+        physical_layer.connect()
+        try:
+            link_layer.wait_ready(self.max_wait)
+            link_layer.remote_link_reposition()
+            app_layer.authenticate(clave_pm)
+        except Exception:
+            physical_layer.disconnect()
+            raise
+        logger.debug("Session %s opened", key[:4])
+        return session
+
+    def create_physical_layer(self, host, port):
+        return Ip((host, port), waiting=0)
+
+    def close(self):
+        """Finish and disconnect all the idle sessions, the expired ones
+        are only disconnected, and wait for the disconnection of the
+        sessions expired in acquire"""
+        now = time.time()
+        with self.lock:
+            sessions = [
+                session for idle in self.idle.values() for session in idle
+            ]
+            self.idle = {}
+            closers, self.closers = self.closers, []
+        for session in sessions:
+            self.discard(session, finish=not session.expired(now))
+        for closer in closers:
+            closer.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
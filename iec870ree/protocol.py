@@ -1,11 +1,15 @@
 import logging
 from abc import ABCMeta, abstractmethod
 from .base_asdu import (
-    AsduParser, FixedAsdu, VariableAsdu
+    AsduParser, FixedAsdu, VariableAsdu, RequestTemplate, Flags_CampoC
 )
 from .app_asdu import *
 from .app_asdu import INSTANT_VALUES_OBJECTS, REGISTRADOR_RM2_OBJECTS
+from .archive import DIRECTION_IN, DIRECTION_OUT
+from .columnar import IntegratedTotalsColumns
 import math
+import time
+from collections import deque
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
@@ -14,6 +18,17 @@ from six import with_metaclass
 
 logger = logging.getLogger('iec870ree')
 
+# Hex dumps of the sent and received frames and bytes. The level is below
+# DEBUG so they are only logged after setting it in the trace logger:
+#   logging.getLogger('iec870ree.trace').setLevel(TRACE)
+TRACE = 5
+logging.addLevelName(TRACE, 'TRACE')
+trace_logger = logging.getLogger('iec870ree.trace')
+
+
+def hexdump(data):
+    return ":".join("%02x" % b for b in bytearray(data))
+
 
 CONTRACTS_REGISTERS = {
     1: 134,
@@ -55,17 +70,19 @@ EXT_TARIFF_OBJECTS = {
     'current_period': 197
 }
 
+# function code of the answer to a link state request (cf 9)
+LINK_STATE_ANSWER = 11
+
 EVENT_ADDRESS_REGISTERS = (52, 53, 54, 55, 128, 129, 131, 132, 133)
 
 
 def parse_asdu(trama):
     p = AsduParser()
-    for x in range(0, len(trama), 2):
-        a = p.append_and_get_if_completed(int(trama[x:x+2], 16))
-    if not a:
+    asdus = p.feed(bytearray.fromhex(trama))
+    if not asdus or p.asdu is not None:
         raise Exception('Trama no completa!')
     else:
-        return a
+        return asdus[-1]
 
 
 class ProtocolException(Exception):
@@ -100,11 +117,80 @@ class NoContentTimeoutException(Exception):
         return 'Timeout: To many Time Without Content'
 
 
+# Response types that come in several batches, a causa_tm 0x05 asks for
+# the next one
+BATCH_TYPES = (
+    M_TA_VC_2.type, M_TA_VM_2.type, M_IT_TK_2.type, M_IT_TG_2.type,
+    M_IB_TK_2.type, M_SP_TA_2.type
+)
+
+
+def response_finished(asdu_resp):
+    """Check the causa_tm of a VariableAsdu answer to a class 2 request.
+
+    :return: True when the request is finished, False when more frames
+        follow
+    :raises: the exception of the error causes
+    """
+    causa_tm = asdu_resp.causa_tm
+    if causa_tm == 0x05 and asdu_resp.tipo in BATCH_TYPES:
+        logger.info("Received request for next batch of information")
+        return False
+    elif causa_tm == 0x05:
+        logger.info("Request or asked")
+    elif causa_tm == 0x07:
+        logger.info("Activation confirmation")
+    elif causa_tm == 0x0A:
+        logger.info("Activation terminated")
+    elif causa_tm == 0x0E:
+        logger.error("Requested ASDU-type not available")
+        raise RequestedASDUTypeNotAvailable()
+    elif causa_tm == 0x10:
+        logger.error("ASDU Direction especification unknown")
+        raise ASDUDirectionUnknown()
+    elif causa_tm == 0x11:
+        logger.error("Requested information object not available")
+        raise IntegrationPeriodNotAvailable()
+    elif causa_tm == 0x12:
+        logger.error("Requested integration period not available")
+        raise IntegrationPeriodNotAvailable()
+    else:
+        raise Exception('ERROR: Transmission cause unknown: {}'.format(causa_tm))
+    return True
+
+
+def lookup_register(registers, register):
+    """Address of a register given by name or number"""
+    if register not in registers:
+        logger.error("Wrong values for register")
+        raise ValueError
+    return registers[register]
+
+
+def lookup_objects(names, objects):
+    """Codes of the extension objects, given either by name or by code"""
+    object_codes = []
+    for object in objects:
+        # You may pass either name or value
+        if object in names.keys():
+            object_codes.append(names[object])
+        elif object in names.values():
+            object_codes.append(object)
+        else:
+            logger.error("Wrong values for required objects: %s", objects)
+            raise ValueError
+    return list(set(object_codes))
+
+
 class AppLayer(with_metaclass(ABCMeta)):
 
     def __init__(self):
         self.last_content_heartbeat = self.connection_start = datetime.now()
         self.set_content_timeout(300)  # in seconds
+        # RequestTemplate by request header fields
+        self.request_templates = {}
+        # a request was sent and its answers were not all read
+        self.in_request = False
 
 
     def initialize(self, link_layer):
@@ -127,8 +213,10 @@ class AppLayer(with_metaclass(ABCMeta)):
     def check_content_timeout(self):
         now = datetime.now()
         diff = (now - self.last_content_heartbeat).total_seconds()
-        logger.info("Last Content Heartbeat: {} seconds".format(diff))
-        logger.info("TOTAL Current Duration: {} seconds".format(self.get_connection_duration()))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Last Content Heartbeat: %s seconds", diff)
+            logger.info("TOTAL Current Duration: %s seconds",
+                        self.get_connection_duration())
         if diff > self.max_content_timeout:
             raise NoContentTimeoutException
 
@@ -137,6 +225,7 @@ class AppLayer(with_metaclass(ABCMeta)):
         return (now - self.connection_start).total_seconds()
 
     def process_request(self, request_asdu):
+        self.in_request = True
         self.link_layer.send_frame(request_asdu)
         asdu_ack = self.link_layer.get_frame()
         if not asdu_ack:
@@ -147,15 +236,11 @@ class AppLayer(with_metaclass(ABCMeta)):
         """ this function makes a very ugly assumption,
         if you don't iterate over all elements, the program will fail"""
         # TODO CHECK CORRECT ACK
+        self.in_request = True
         while True:
-            asdu = FixedAsdu()
-            asdu.c.res = 0
-            asdu.c.prm = 1
-            asdu.c.fcb = self.link_layer.fcb
-            asdu.c.fcv = 1
-            asdu.c.cf = 11
-            asdu.der = self.link_layer.der
-            asdu.generate()
+            asdu = self.link_layer.create_class2_request_asdu(
+                self.link_layer.fcb
+            )
             self.link_layer.send_frame(asdu)
             asdu_resp = self.link_layer.get_frame()
             if not asdu_resp:
@@ -166,34 +251,9 @@ class AppLayer(with_metaclass(ABCMeta)):
             if not isinstance(asdu_resp, VariableAsdu):
                 self.check_content_timeout()
                 continue
-            if asdu_resp.causa_tm == 0x05 and asdu_resp.tipo in [
-                M_TA_VC_2.type, M_TA_VM_2.type, M_IT_TK_2.type, M_IT_TG_2.type,
-                M_IB_TK_2.type, M_SP_TA_2.type]:
-                logger.info("Received request for next batch of information")
-            elif asdu_resp.causa_tm == 0x05:
-                logger.info("Request or asked")
-                break
-            elif asdu_resp.causa_tm == 0x07:
-                logger.info("Activation confirmation")
+            if response_finished(asdu_resp):
+                self.in_request = False
                 break
-            elif asdu_resp.causa_tm == 0x0A:
-                logger.info("Activation terminated")
-                break
-            elif asdu_resp.causa_tm == 0x0E:
-                logger.error("Requested ASDU-type not available")
-                raise RequestedASDUTypeNotAvailable()
-            elif asdu_resp.causa_tm == 0x10:
-                logger.error("ASDU Direction especification unknown")
-                raise ASDUDirectionUnknown()
-            elif asdu_resp.causa_tm == 0x11:
-                logger.error("Requested information object not available")
-                raise IntegrationPeriodNotAvailable()
-            elif asdu_resp.causa_tm == 0x12:
-                logger.error("Requested integration period not available")
-                raise IntegrationPeriodNotAvailable()
-            else:
-                raise Exception('ERROR: Transmission cause unknown: {}'.format(asdu_resp.causa_tm))
-
             self.check_content_timeout()
 
     def authenticate(self, clave_pm):
@@ -208,15 +268,11 @@ class AppLayer(with_metaclass(ABCMeta)):
         try:
             resps = list(self.process_request(asdu))
         except Exception as e:
-            logger.exception("error finishing session {}".format(e))
+            logger.exception("error finishing session %s", e)
 
     def read_absolute_values(self, start_date, end_date, register='daily_billings'):
         #122
-        if register in READINGS_REGISTERS:
-            register = READINGS_REGISTERS[register]
-        else:
-            logger.error("Wrong values for register")
-            raise ValueError
+        register = lookup_register(READINGS_REGISTERS, register)
         asdu = self.create_asdu_request(C_CI_NT_2(start_date, end_date),
                                         register)
         #do not remove this as we have to iterate over physical layer frames.
@@ -228,11 +284,7 @@ class AppLayer(with_metaclass(ABCMeta)):
 
     def read_incremental_values(self, start_date, end_date, register='profiles'):
         #123
-        if register in READINGS_REGISTERS:
-            register = READINGS_REGISTERS[register]
-        else:
-            logger.error("Wrong values for register")
-            raise ValueError
+        register = lookup_register(READINGS_REGISTERS, register)
         asdu = self.create_asdu_request(C_CI_NU_2(start_date, end_date),
                                         register)
         #do not remove this as we have to iterate over physical layer frames.
@@ -242,6 +294,14 @@ class AppLayer(with_metaclass(ABCMeta)):
                 self.reset_content_received()
                 yield resp
 
+    def read_incremental_columns(self, start_date, end_date,
+                                 register='profiles'):
+        """Same read as read_incremental_values, the values are returned
+        as an IntegratedTotalsColumns"""
+        return IntegratedTotalsColumns().extend(
+            self.read_incremental_values(start_date, end_date, register)
+        )
+
     def read_datetime(self):
         #103
         asdu = self.create_asdu_request(C_TI_NA_2())
@@ -260,11 +320,7 @@ class AppLayer(with_metaclass(ABCMeta)):
 
     def current_tariff_info(self, register=1):
         #133 current values
-        if register in CONTRACTS_REGISTERS:
-            register = CONTRACTS_REGISTERS[register]
-        else:
-            logger.error("Wrong values for register")
-            raise ValueError
+        register = lookup_register(CONTRACTS_REGISTERS, register)
         asdu = self.create_asdu_request(C_TA_VC_2(), register)
         resps = list(self.process_request(asdu))
         for resp in self.process_requestresponse():
@@ -274,11 +330,7 @@ class AppLayer(with_metaclass(ABCMeta)):
 
     def stored_tariff_info(self, start_date, end_date, register=1):
         #134 stored values
-        if register in CONTRACTS_REGISTERS:
-            register = CONTRACTS_REGISTERS[register]
-        else:
-            logger.error("Wrong values for register")
-            raise ValueError
+        register = lookup_register(CONTRACTS_REGISTERS, register)
         asdu = self.create_asdu_request(C_TA_VM_2(start_date, end_date), register)
         resps = list(self.process_request(asdu))
         for resp in self.process_requestresponse():
@@ -296,11 +348,7 @@ class AppLayer(with_metaclass(ABCMeta)):
 
     def get_contracted_powers(self, register=1):
         # 144 Get contracted powers
-        if register in CONTRACTS_REGISTERS:
-            register = CONTRACTS_REGISTERS[register]
-        else:
-            logger.error("Wrong values for register")
-            raise ValueError
+        register = lookup_register(CONTRACTS_REGISTERS, register)
         asdu = self.create_asdu_request(C_PC_NA_2(), register)
         resps = list(self.process_request(asdu))
         for resp in resps:
@@ -335,11 +383,7 @@ class AppLayer(with_metaclass(ABCMeta)):
 
     def read_holiday_days(self, register=1):
         # 147 Get holiday days
-        if register in CONTRACTS_REGISTERS:
-            register = CONTRACTS_REGISTERS[register]
-        else:
-            logger.error("Wrong values for register")
-            raise ValueError
+        register = lookup_register(CONTRACTS_REGISTERS, register)
         asdu = self.create_asdu_request(C_DF_NA_2(), register)
         resps = list(self.process_request(asdu))
         for resp in resps:
@@ -364,21 +408,17 @@ class AppLayer(with_metaclass(ABCMeta)):
             if isinstance(resp, VariableAsdu) and resp.tipo == M_SP_TA_2.type:
                 yield resp
 
+    def read_event_records(self, register=52, date_from=None, date_to=None):
+        """Same read as read_events, yields the EventRecord of each event"""
+        for resp in self.read_events(register, date_from, date_to):
+            for record in M_SP_TA_2.decode_records(resp.data,
+                                                   resp.cualificador_ev):
+                yield record
+
     # Protocol extension
     def ext_read_rm2_values(self, register=0, objects=['traforatio']):
         # 157
-        object_codes = []
-        for object in objects:
-            # You may pass either name or value
-            if object in EXT_RM2_OBJECTS.keys():
-                object_codes.append(EXT_RM2_OBJECTS[object])
-            elif object in EXT_RM2_OBJECTS.values():
-                object_codes.append(object)
-            else:
-                logger.error("Wrong values for required objects: {}".format(objects))
-                raise ValueError
-
-        object_codes = list(set(object_codes))
+        object_codes = lookup_objects(EXT_RM2_OBJECTS, objects)
         asdu = self.create_asdu_request(P_RM_R2_2(object_codes), register)
         resps = list(self.process_request(asdu))
 
@@ -390,18 +430,7 @@ class AppLayer(with_metaclass(ABCMeta)):
     def ext_read_instant_values(self, register=0, objects=['totalizadores']):
         # 162
 
-        object_codes = []
-        for object in objects:
-            # You may pass either name or value
-            if object in EXT_INSTANT_OBJECTS.keys():
-                object_codes.append(EXT_INSTANT_OBJECTS[object])
-            elif object in EXT_INSTANT_OBJECTS.values():
-                object_codes.append(object)
-            else:
-                logger.error("Wrong values for required objects: {}".format(objects))
-                raise ValueError
-
-        object_codes = list(set(object_codes))
+        object_codes = lookup_objects(EXT_INSTANT_OBJECTS, objects)
         asdu = self.create_asdu_request(P_IN_VA_2(object_codes), register)
         resps = list(self.process_request(asdu))
 
@@ -413,18 +442,7 @@ class AppLayer(with_metaclass(ABCMeta)):
     def ext_read_contract_tariff_info(self, register=134, objects=['special_days']):
         # 150
 
-        object_codes = []
-        for object in objects:
-            # You may pass either name or value
-            if object in EXT_TARIFF_OBJECTS.keys():
-                object_codes.append(EXT_TARIFF_OBJECTS[object])
-            elif object in EXT_TARIFF_OBJECTS.values():
-                object_codes.append(object)
-            else:
-                logger.error("Wrong values for required objects: {}".format(objects))
-                raise ValueError
-
-        object_codes = list(set(object_codes))
+        object_codes = lookup_objects(EXT_TARIFF_OBJECTS, objects)
         asdu = self.create_asdu_request(P_TA_IN_2(object_codes), register)
         resps = list(self.process_request(asdu))
 
@@ -433,55 +451,114 @@ class AppLayer(with_metaclass(ABCMeta)):
                 return resp
 
     def create_asdu_request(self, user_data, registro=0):
-        asdu = VariableAsdu()
-        asdu.c.res = 0
-        asdu.c.prm = 1
-        asdu.c.fcb = self.link_layer.fcb
-        asdu.c.fcv = 1
-        asdu.c.cf = 3
-        asdu.der = self.link_layer.der
+        fcb = self.link_layer.fcb
+        # registro> 11 curvas horarias, 12 cuartohorarias, 21 resumenes diarios
+        key = (self.link_layer.der, self.link_layer.dir_pm, user_data.type,
+               registro, getattr(user_data, 'data_length', 0x06),
+               getattr(user_data, 'causa_tm', 6), user_data.length)
+        template = self.request_templates.get(key)
+        if template is None:
+            template = self.request_templates[key] = \
+                self.create_request_template(user_data, registro)
+        return template.stamp(fcb, user_data.to_bytes(), user_data)
+
+    def create_request_template(self, user_data, registro=0):
+        c = Flags_CampoC()
+        c.res = 0
+        c.prm = 1
+        c.fcv = 1
+        c.cf = 3
         if user_data.type in (102,):
-            asdu.cualificador_ev = 0
+            cualificador_ev = 0
         else:
-            asdu.cualificador_ev = math.ceil(getattr(user_data, 'data_length', 0x06)/0x06)
-        asdu.causa_tm = getattr(user_data, 'causa_tm', 6)
-        asdu.dir_pm = self.link_layer.dir_pm
-        # registro> 11 curvas horarias, 12 cuartohorarias, 21 resumenes diarios
-        asdu.dir_registro = registro
-        asdu.content = user_data
-        asdu.generate()
-        return asdu
+            cualificador_ev = math.ceil(getattr(user_data, 'data_length', 0x06)/0x06)
+        return RequestTemplate(
+            c.asByte, self.link_layer.der, user_data.type,
+            cualificador_ev, getattr(user_data, 'causa_tm', 6),
+            self.link_layer.dir_pm, registro, user_data.length
+        )
 
 
 class LinkLayer(with_metaclass(ABCMeta)):
 
-    def __init__(self, der=None, dir_pm=None):
+    def __init__(self, der=None, dir_pm=None, resync=False, archive=None):
+        """Link layer.
+
+        :param resync: drop wrong frames and keep reading instead of
+            raising a ParserException, see AsduParser
+        :param archive: ArchiveWriter where the sent and received frames
+            are stored with the DER as meter id
+        """
         self.der = der
         self.dir_pm = dir_pm
+        self.resync = resync
+        self.archive = archive
         self._fcb = 0
+        self.class2_requests = {}
     
     def initialize(self, physical_layer):
         self.physical_layer = physical_layer
-        self.asdu_parser = AsduParser()
+        self.asdu_parser = AsduParser(resync=self.resync)
+        # frames completed by the last chunk but not returned yet
+        self.pending_frames = deque()
+        # answers to the link state requests of wait_ready that timed out,
+        # get_frame drops them when they arrive
+        self.late_link_states = 0
 
     def send_frame(self, frame):
-        logger.info("sending frame\n {}".format(frame))
-        logging.info("->" + ":".join("%02x" % b for b in frame.buffer))
+        self.log_frame_sent(frame)
         self.physical_layer.send_bytes(frame.buffer)
+        self.archive_frame(frame, DIRECTION_OUT)
 
     def get_frame(self, timeout=60):
-        frame = None
         logger.info("receiving frame")
-        while not frame:
-            bt = self.physical_layer.get_byte(timeout)
-            frame = self.asdu_parser.append_and_get_if_completed(bt)
-        logger.info("received frame {}".format(frame))
-        return frame
+        frames = self.pending_frames
+        while True:
+            while not frames:
+                chunk = self.physical_layer.read_available(timeout)
+                if chunk is None:
+                    raise ProtocolException("Connection closed")
+                frames.extend(self.asdu_parser.feed(chunk))
+            frame = frames.popleft()
+            self.log_frame_received(frame)
+            self.archive_frame(frame, DIRECTION_IN)
+            if not (self.late_link_states and self.is_late_link_state(frame)):
+                return frame
+
+    def is_late_link_state(self, frame):
+        """Link state answer while late answers of wait_ready are expected,
+        it is counted as received"""
+        if isinstance(frame, FixedAsdu) and frame.c.cf == LINK_STATE_ANSWER:
+            self.late_link_states -= 1
+            logger.info("Dropped late link state answer")
+            return True
+        return False
+
+    def log_frame_sent(self, frame):
+        logger.info("sending frame\n %s", frame)
+        if trace_logger.isEnabledFor(TRACE):
+            trace_logger.log(TRACE, "->%s", hexdump(frame.buffer))
+
+    def log_frame_received(self, frame):
+        logger.info("received frame %s", frame)
+        if trace_logger.isEnabledFor(TRACE):
+            trace_logger.log(TRACE, "<-%s", hexdump(frame.buffer))
+
+    def archive_frame(self, frame, direction):
+        if self.archive is not None:
+            self.archive.write(frame, self.der, direction)
+
+    def reset_parser(self):
+        """Drop the frames already received and the partial frame"""
+        self.pending_frames.clear()
+        self.asdu_parser = AsduParser(resync=self.resync)
 
     def empty_buffer(self):
+        self.reset_parser()
         while 1:
             try:
-                self.physical_layer.get_byte(1)
+                if self.physical_layer.read_available(1) is None:
+                    break
             except Exception as error:
                 logger.info("Buffer emptied. retrying")
                 break
@@ -489,12 +566,12 @@ class LinkLayer(with_metaclass(ABCMeta)):
     def link_state_request(self, retries=None):
         resp = None
         asdu = self.create_link_state_asdu()
-        logger.info("Send link state Retries {}".format(retries))
+        logger.info("Send link state Retries %s", retries)
         self.send_frame(asdu)
         try:
             resp = self.get_frame()
         except Exception as e:
-            logger.info("Link State Exception: {}".format(e))
+            logger.info("Link State Exception: %s", e)
             if retries:
                 retries -= 1
                 # empty buffer
@@ -504,6 +581,41 @@ class LinkLayer(with_metaclass(ABCMeta)):
             raise ProtocolException("Link state request didn't get response")
         return resp
 
+    def wait_ready(self, max_wait=5, first_timeout=0.25):
+        """Send link state requests until the meter answers, to use instead
+        of a fixed wait after connecting.
+
+        The timeout of each request starts at first_timeout and doubles,
+        the requests stop when max_wait seconds have passed. The answers
+        to the requests that timed out may still arrive, get_frame drops
+        them, otherwise they would be taken as the answers to the next
+        requests.
+        """
+        asdu = self.create_link_state_asdu()
+        deadline = time.time() + max_wait
+        timeout = first_timeout
+        unanswered = 0
+        while True:
+            self.send_frame(asdu)
+            try:
+                resp = self.get_frame(timeout)
+            except ProtocolException:
+                raise
+            except Exception as e:
+                remaining = deadline - time.time()
+                logger.info("Link not ready after %s seconds: %s",
+                            timeout, e)
+                if remaining <= 0:
+                    raise ProtocolException(
+                        "Link state request didn't get response"
+                    )
+                self.reset_parser()
+                unanswered += 1
+                timeout = min(timeout * 2, remaining)
+                continue
+            self.late_link_states = unanswered
+            return resp
+
     def create_link_state_asdu(self):
         asdu = FixedAsdu()
         asdu.c.res = 0
@@ -515,6 +627,22 @@ class LinkLayer(with_metaclass(ABCMeta)):
         asdu.generate()
         return asdu
 
+    def create_class2_request_asdu(self, fcb):
+        """Request of class 2 data, one frame is built for each FCB and
+        reused, it must not be modified"""
+        asdu = self.class2_requests.get((self.der, fcb))
+        if asdu is None:
+            asdu = FixedAsdu()
+            asdu.c.res = 0
+            asdu.c.prm = 1
+            asdu.c.fcb = fcb
+            asdu.c.fcv = 1
+            asdu.c.cf = 11
+            asdu.der = self.der
+            asdu.generate()
+            self.class2_requests[(self.der, fcb)] = asdu
+        return asdu
+
     def remote_link_reposition(self, retries=None):
         resp = None
         asdu = self.create_remote_link_reposition_asdu()
@@ -567,3 +695,15 @@ class PhysicalLayer(with_metaclass(ABCMeta)):
     @abstractmethod
     def get_byte(self, timeout):
         pass
+
+    def read_available(self, timeout):
+        """Read the received bytes, waiting up to timeout for at least one.
+
+        :return: bytearray, or None when the connection is closed. The
+            default reads a single byte with get_byte, physical layers that
+            receive in chunks return all the buffered bytes.
+        """
+        bt = self.get_byte(timeout)
+        if bt is None:
+            return None
+        return bytearray((bt,))
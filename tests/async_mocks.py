@@ -0,0 +1,20 @@
+"""Coroutine mocks, only imported by the tests that run on Python 3"""
+
+
+class MockAsyncPhysicalLayer(object):
+    """Returns the chunks of to_receive, the exceptions in it are raised"""
+
+    def __init__(self, to_receive):
+        self.sent = []
+        self.to_receive = list(to_receive)
+
+    async def send_bytes(self, bts):
+        self.sent.append(bytearray(bts))
+
+    async def read_available(self, timeout):
+        if not self.to_receive:
+            return None
+        chunk = self.to_receive.pop(0)
+        if isinstance(chunk, Exception):
+            raise chunk
+        return chunk
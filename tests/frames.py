@@ -0,0 +1,30 @@
+"""Frames shared by the tests"""
+from . import context
+from iec870ree import base_asdu
+
+# Frames of the meter with DER 34572: a link layer frame and a C_AC_NA_2
+# authentication request with key 7
+FIXED_FRAME = bytearray.fromhex("10 00 0c 87 93 16")
+VARIABLE_FRAME = bytearray.fromhex(
+    "68 0D 0D 68 73 0C 87 B7 01 06 01 00 00 07 00 00 00 CC 16"
+)
+
+
+def variable_frame(tipo, data, der=1, causa_tm=7, cualificador_ev=1,
+                   dir_pm=1, dir_registro=0):
+    """Buffer of a VariableAsdu sent by a meter"""
+    asdu = base_asdu.VariableAsdu()
+    asdu.c.cf = 8
+    asdu.der = der
+    asdu.tipo = tipo
+    asdu.cualificador_ev = cualificador_ev
+    asdu.causa_tm = causa_tm
+    asdu.dir_pm = dir_pm
+    asdu.dir_registro = dir_registro
+    asdu.data = data
+    asdu.generate()
+    return asdu.buffer
+
+
+def parse_frame(buffer):
+    return base_asdu.AsduParser().feed(buffer)[0]
@@ -1,20 +1,77 @@
 from . import context
 import unittest
+import calendar
 import datetime
+import random
+import bitstring
 from pytz import timezone
-from iec870ree import app_asdu
+from iec870ree import app_asdu, dst
 from iec870ree.app_asdu import IntegratedTotals, BillingRegister, SerialPortConf
+from .frames import parse_frame, variable_frame
 
 import logging
 logging.basicConfig(level=logging.DEBUG)
 
 TIMEZONE = timezone('Europe/Madrid')
 
+# R_IN_VA_2 objects 192, 193 and 194
+INSTANT_VALUES_DATA = bytearray.fromhex(
+    "c0 62 e7 03 00 d2 0f 01 00 99 b1 00 00 5e 25 00 "
+    "00 9d 01 00 00 06 0b 00 00 37 92 6e 04 15 c1 08 "
+    "00 00 03 00 00 9a 03 02 00 00 00 00 00 dc 01 03 "
+    "00 00 01 00 00 05 02 02 00 00 01 00 00 aa 01 37 "
+    "92 6e 04 15 c2 0c 00 00 55 09 00 00 0d 00 00 55 "
+    "09 00 00 0c 00 00 47 09 00 00 37 92 6e 04 15 03 "
+    "16"
+)
+# R_TA_IN_2 object 193, seasons
+SEASONS_DATA = bytearray.fromhex(
+    "c1 01 02 0a 00 00 e1 01 63 61 00 00 e1 03 63 64 "
+    "00 00 e1 04 63 65 00 00 e1 06 63 63 00 00 f0 06 "
+    "63 62 00 00 e1 08 63 66 00 00 e1 09 63 63 00 00 "
+    "e1 0a 63 65 00 00 e1 0b 63 64 00 00 e1 0c 63 61 "
+    "06 66 66 66 66 22 11 21 22 22 11 21 22 66 66 66 "
+    "66 22 12 11 11 11 21 22 22 66 66 66 66 34 33 33 "
+    "43 44 44 44 44 66 66 66 66 44 44 44 44 33 33 33 "
+    "44 66 66 66 66 55 55 55 55 55 55 55 55 66 66 66 "
+    "66 66 66 66 66 66 66 66 66 31 92 75 f7 15"
+)
+
 
 def localize(dt):
     return TIMEZONE.localize(dt)
 
 
+TIME_A_BITS = [
+    ('minute', 6), ('TIS', 1), ('IV', 1), ('hour', 5), ('RES1', 2),
+    ('SU', 1), ('dayofmonth', 5), ('dayofweek', 3), ('month', 4),
+    ('ETI', 2), ('PTI', 2), ('year', 7), ('RES2', 1)
+]
+
+
+def bitstring_to_bytes(fields):
+    """Reference bitstring encoder, as TimeA/TimeB used to do it"""
+    response = bitstring.BitArray()
+    for value, bits in fields:
+        thedata = bitstring.BitArray(bytearray([value >> 8, value & 0xFF]))
+        response = response + thedata[-1:-(bits + 1):-1]
+    response = response[::-1]
+    return response.tobytes()[::-1]
+
+
+def bitstring_time_a_to_bytes(tiempo):
+    return bitstring_to_bytes(
+        [(getattr(tiempo, name), bits) for name, bits in TIME_A_BITS]
+    )
+
+
+def bitstring_time_b_to_bytes(tiempo):
+    return bitstring_to_bytes(
+        [(int(tiempo.microseconds / 1000), 10), (tiempo.seconds, 6)]
+        + [(getattr(tiempo, name), bits) for name, bits in TIME_A_BITS]
+    )
+
+
 class TestAppAsdu(unittest.TestCase):
 
     def test_registry(self):
@@ -51,6 +108,123 @@ class TestAppAsdu(unittest.TestCase):
             localize(datetime.datetime(2010,2,7,11,0))
         )
 
+    def test_time_a_from_hex_fields(self):
+        tiempo = app_asdu.TimeA()
+        tiempo.from_hex(bytearray.fromhex("ff ff ff ff ff"))
+        self.assertEqual(
+            (tiempo.minute, tiempo.TIS, tiempo.IV, tiempo.hour, tiempo.RES1,
+             tiempo.SU, tiempo.dayofmonth, tiempo.dayofweek, tiempo.month,
+             tiempo.ETI, tiempo.PTI, tiempo.year, tiempo.RES2),
+            (63, 1, 1, 31, 3, 1, 31, 7, 15, 3, 3, 127, 1)
+        )
+
+        tiempo.from_hex(bytearray.fromhex("00 4f a5 b3 8c 95"), 1)
+        self.assertEqual(
+            (tiempo.minute, tiempo.TIS, tiempo.IV, tiempo.hour, tiempo.RES1,
+             tiempo.SU, tiempo.dayofmonth, tiempo.dayofweek, tiempo.month,
+             tiempo.ETI, tiempo.PTI, tiempo.year, tiempo.RES2),
+            (15, 1, 0, 5, 1, 1, 19, 5, 12, 0, 2, 21, 1)
+        )
+
+    def test_time_b_from_hex_fields(self):
+        tiempo = app_asdu.TimeB()
+        tiempo.from_hex(bytearray.fromhex("ff ff ff ff ff ff ff"))
+        self.assertEqual(
+            (tiempo.microseconds, tiempo.seconds, tiempo.minute, tiempo.TIS,
+             tiempo.IV, tiempo.hour, tiempo.RES1, tiempo.SU,
+             tiempo.dayofmonth, tiempo.dayofweek, tiempo.month, tiempo.ETI,
+             tiempo.PTI, tiempo.year, tiempo.RES2),
+            (1023000, 63, 63, 1, 1, 31, 3, 1, 31, 7, 15, 3, 3, 127, 1)
+        )
+
+        tiempo.from_hex(bytearray.fromhex("00 00 0a 2a 4f a5 b3 8c 95"), 2)
+        self.assertEqual(
+            (tiempo.microseconds, tiempo.seconds, tiempo.minute, tiempo.TIS,
+             tiempo.IV, tiempo.hour, tiempo.RES1, tiempo.SU,
+             tiempo.dayofmonth, tiempo.dayofweek, tiempo.month, tiempo.ETI,
+             tiempo.PTI, tiempo.year, tiempo.RES2),
+            (522000, 10, 15, 1, 0, 5, 1, 1, 19, 5, 12, 0, 2, 21, 1)
+        )
+
+    def test_time_decode(self):
+        class CountingTable(object):
+            calls = 0
+
+            def localize(self, dt, is_dst=False):
+                CountingTable.calls += 1
+                return TIMEZONE.localize(dt, is_dst=is_dst)
+
+        class CountingTimeB(app_asdu.TimeB):
+            __slots__ = ()
+            dst_table = CountingTable()
+
+        data = bytearray.fromhex("00 00 0a 2a 4f a5 b3 8c 95")
+        tiempo = CountingTimeB.decode(data, 2)
+        self.assertEqual(CountingTable.calls, 0)
+        expected = CountingTimeB()
+        expected.from_hex(data, 2)
+        self.assertEqual(CountingTable.calls, 1)
+        self.assertEqual(tiempo.get_cp40(), expected.get_cp40())
+        self.assertEqual(tiempo.datetime, expected.datetime)
+
+        tiempo = app_asdu.TimeA.decode(bytearray.fromhex("01 00 12 09 09"))
+        self.assertEqual(
+            tiempo.datetime, localize(datetime.datetime(2009, 9, 18, 0, 1))
+        )
+
+    def test_datetime_cache(self):
+        cache = app_asdu.DatetimeCache(maxsize=2)
+        data = bytearray.fromhex("00 81 e1 07 12 00 82 e1 07 12")
+        for offset in (0, 0, 5, 0):
+            tiempo = app_asdu.TimeA()
+            tiempo.from_hex(data, offset)
+            key = app_asdu.TimeA.CP40.unpack_from(data, offset)
+            self.assertEqual(
+                cache.get(key, lambda: tiempo.datetime), tiempo.datetime
+            )
+        self.assertEqual(cache.info(), (2, 2, 2, 2))
+
+        cache.get((1, ), lambda: None)
+        self.assertNotIn((0, 0x82, 0xe1, 7, 0x12), cache._values)
+        cache.clear()
+        self.assertEqual(cache.info(), (0, 0, 2, 0))
+
+        self.assertEqual(
+            app_asdu.cp40_datetime(data, 5),
+            localize(datetime.datetime(2018, 7, 1, 2))
+        )
+        self.assertEqual(
+            app_asdu.cp56_datetime(bytearray.fromhex("0a 2a 10 0b e7 02 0a")),
+            localize(datetime.datetime(2010, 2, 7, 11, 16, 10, 522000))
+        )
+
+    def test_datetime_cache_timezone(self):
+        canary = dst.get_table('Atlantic/Canary')
+
+        class CanaryTimeA(app_asdu.TimeA):
+            __slots__ = ()
+            dst_table = canary
+
+        data = bytearray.fromhex("00 81 e1 07 12")
+        madrid = app_asdu.cp40_datetime(data)
+        self.assertEqual(madrid, localize(datetime.datetime(2018, 7, 1, 1)))
+        self.assertEqual(
+            app_asdu.cp40_datetime(data, 0, CanaryTimeA),
+            canary.localize(datetime.datetime(2018, 7, 1, 1), is_dst=True)
+        )
+        table = app_asdu.TimeBase.dst_table
+        app_asdu.TimeBase.dst_table = canary
+        try:
+            self.assertEqual(app_asdu.cp40_datetime(data).utcoffset(),
+                             datetime.timedelta(hours=1))
+            self.assertEqual(
+                app_asdu.cp40_octets_epoch(tuple(data)),
+                calendar.timegm(madrid.utctimetuple()) + 3600
+            )
+        finally:
+            app_asdu.TimeBase.dst_table = table
+        self.assertEqual(app_asdu.cp40_datetime(data), madrid)
+
     def test_empty_time_a_from_hex(self):
         tiempo = app_asdu.TimeA()
 
@@ -125,6 +299,29 @@ class TestAppAsdu(unittest.TestCase):
         self.assertEqual(t2w.datetime.dst().seconds, 0)
         self.assertEqual(t2w.datetime, dw)
 
+    def test_time_to_bytes_as_bitstring(self):
+        d = datetime.datetime(2018, 1, 1, 0, 0)
+        for hours in range(0, 24 * 365, 7):
+            dt = d + datetime.timedelta(hours=hours, seconds=hours % 60,
+                                        microseconds=(hours % 1000) * 1000)
+            tiempo_a = app_asdu.TimeA(dt)
+            tiempo_b = app_asdu.TimeB(dt)
+            self.assertEqual(tiempo_a.to_bytes(),
+                             bitstring_time_a_to_bytes(tiempo_a))
+            self.assertEqual(tiempo_b.to_bytes(),
+                             bitstring_time_b_to_bytes(tiempo_b))
+
+        rand = random.Random(870)
+        for _ in range(500):
+            tiempo_b = app_asdu.TimeB()
+            tiempo_b.from_hex(bytearray(rand.getrandbits(8) for _ in range(7)))
+            tiempo_a = app_asdu.TimeA()
+            tiempo_a.from_hex(tiempo_b.to_bytes(), 2)
+            self.assertEqual(tiempo_a.to_bytes(),
+                             bitstring_time_a_to_bytes(tiempo_a))
+            self.assertEqual(tiempo_b.to_bytes(),
+                             bitstring_time_b_to_bytes(tiempo_b))
+
     def test_time_b_to_bytes(self):
         d = datetime.datetime(2017, 1, 2, 3, 4, 5, 678000)
         tiempo = app_asdu.TimeB(d)
@@ -284,6 +481,82 @@ class TestAppAsdu(unittest.TestCase):
             localize(datetime.datetime(2018, 7, 1, 1))
         )
 
+    def test_M_IB_TK_2_from_hex(self):
+        c = app_asdu.M_IB_TK_2()
+        c.from_hex(bytearray.fromhex(
+            "0b 01 00 00 00 00 02 00 00 00 80 03 00 00 00 00 00 81 e1 07 12"
+            "0a 04 00 00 00 00 05 00 00 00 00 06 00 00 00 00"
+            "07 00 00 00 00 08 00 00 00 00 09 01 00 00 00 00 82 e1 07 12"
+        ), 2)
+        first = localize(datetime.datetime(2018, 7, 1, 1))
+        second = localize(datetime.datetime(2018, 7, 1, 2))
+        self.assertEqual(
+            c.valores[:3],
+            [
+                IntegratedTotals(1, 1, 0, first),
+                IntegratedTotals(2, 2, 128, first),
+                IntegratedTotals(3, 3, 0, first),
+            ]
+        )
+        self.assertEqual(
+            c.valores[3:],
+            [IntegratedTotals(t, t + 3, 0, second) for t in range(1, 6)]
+            + [IntegratedTotals(6, 265, 0, second)]
+        )
+        self.assertEqual(c.tiempo.datetime, second)
+
+    def test_M_TA_VX_2_from_hex(self):
+        record = bytearray.fromhex(
+            "14 74 37 3b 00 c0 6e 00 00 00 fb 59 1c 00 ba 5c 00 00 00"
+            "e4 bd 05 00 db 06 00 00 00 00 00 00 00 80 00 00 00 00 80"
+            "65 01 00 00 0f 87 f2 07 12 00 00 00 00 00 80"
+            "00 80 e1 07 12 00 80 61 08 12"
+        )
+        c = app_asdu.M_TA_VM_2()
+        c.from_hex(record + record, 2)
+        self.assertEqual(len(c.valores), 2)
+        self.assertEqual(c.valores[0], c.valores[1])
+        # the count is the one of the frame, not the one of the payload
+        padded = app_asdu.M_TA_VM_2()
+        padded.from_hex(record + record + bytearray(10), 1)
+        self.assertEqual(padded.valores, c.valores[:1])
+        with self.assertRaises(ValueError):
+            app_asdu.M_TA_VM_2().from_hex(record + record[:-1], 2)
+        self.assertEqual(
+            c.valores[0],
+            BillingRegister(
+                20, 3880820, 7258304, 0, 1858043, 23738, 0, 376292, 1755, 0,
+                0, 128, 0, 128, 357,
+                localize(datetime.datetime(2018, 7, 18, 7, 15)), 0, 0, 128,
+                localize(datetime.datetime(2018, 7, 1)),
+                localize(datetime.datetime(2018, 8, 1))
+            )
+        )
+
+    def test_M_SP_TA_2_decode_records(self):
+        data = bytearray.fromhex(
+            "03 03 0a 2a 10 0b e7 02 0a"
+            "07 12 00 90 25 8b 7c 08 13"
+        )
+        c = app_asdu.M_SP_TA_2()
+        c.from_hex(data, 2)
+        records = app_asdu.M_SP_TA_2.decode_records(data, 2)
+        self.assertEqual(
+            records,
+            [
+                app_asdu.EventRecord(3, 1, 1, 1265537770522),
+                app_asdu.EventRecord(7, 9, 0, 1566985056000),
+            ]
+        )
+        for event, record in zip(c.valores, records):
+            self.assertEqual(event[:3], record[:3])
+            dt = event.date.datetime
+            self.assertEqual(
+                calendar.timegm(dt.utctimetuple()) * 1000
+                + dt.microsecond // 1000,
+                record.epoch_ms
+            )
+
     def test_C_TA_VM_2(self):
         c = app_asdu.C_TA_VM_2(
             datetime.datetime(2018, 7, 1, 1),
@@ -380,30 +653,67 @@ class TestAppAsdu(unittest.TestCase):
 
     def test_R_IN_VA_2(self):
         c = app_asdu.R_IN_VA_2()
-        data = bytearray.fromhex(
-            "c0 62 e7 03 00 d2 0f 01 00 99 b1 00 00 5e 25 00 "
-            "00 9d 01 00 00 06 0b 00 00 37 92 6e 04 15 c1 08 "
-            "00 00 03 00 00 9a 03 02 00 00 00 00 00 dc 01 03 "
-            "00 00 01 00 00 05 02 02 00 00 01 00 00 aa 01 37 "
-            "92 6e 04 15 c2 0c 00 00 55 09 00 00 0d 00 00 55 "
-            "09 00 00 0c 00 00 47 09 00 00 37 92 6e 04 15 03 "
-            "16"
-        )
-        c.from_hex(data, 3)
+        c.from_hex(INSTANT_VALUES_DATA, 3)
         print(c)
 
     def test_R_TA_IN_2(self):
         c = app_asdu.R_IN_VA_2()
-        data = bytearray.fromhex(
-            "c1 01 02 0a 00 00 e1 01 63 61 00 00 e1 03 63 64 "
-            "00 00 e1 04 63 65 00 00 e1 06 63 63 00 00 f0 06 "
-            "63 62 00 00 e1 08 63 66 00 00 e1 09 63 63 00 00 "
-            "e1 0a 63 65 00 00 e1 0b 63 64 00 00 e1 0c 63 61 "
-            "06 66 66 66 66 22 11 21 22 22 11 21 22 66 66 66 "
-            "66 22 12 11 11 11 21 22 22 66 66 66 66 34 33 33 "
-            "43 44 44 44 44 66 66 66 66 44 44 44 44 33 33 33 "
-            "44 66 66 66 66 55 55 55 55 55 55 55 55 66 66 66 "
-            "66 66 66 66 66 66 66 66 66 31 92 75 f7 15"
-        )
-        c.from_hex(data, 1)
-        print(c)
\ No newline at end of file
+        c.from_hex(SEASONS_DATA, 1)
+        print(c)
+
+    def test_parse_R_IN_VA_2_frame(self):
+        frame = parse_frame(variable_frame(
+            app_asdu.R_IN_VA_2.type, INSTANT_VALUES_DATA, causa_tm=5,
+            cualificador_ev=3
+        ))
+        totals, powers, phases = frame.content.valores
+        self.assertEqual(totals.valores.ai, 255842)
+        self.assertEqual(
+            [power.potencia_activa for power in powers.valores[:4]],
+            [8, 2, 3, 2]
+        )
+        self.assertEqual([phase.V for phase in phases.valores[:3]],
+                         [238.9, 238.9, 237.5])
+
+    def test_parse_R_TA_IN_2_frame(self):
+        frame = parse_frame(variable_frame(
+            app_asdu.R_TA_IN_2.type, SEASONS_DATA, causa_tm=5
+        ))
+        seasons, = frame.content.valores
+        self.assertIsInstance(seasons, app_asdu.Seasons)
+        self.assertEqual((seasons.sentido, seasons.tipo), (1, 2))
+        self.assertEqual(len(seasons.temporadas), 10)
+        self.assertEqual(len(seasons.dias), 6)
+        self.assertEqual(seasons.dias[0].horas, '666666662211122222111222')
+        self.assertEqual(
+            seasons.fecha_activacion.datetime.replace(tzinfo=None),
+            datetime.datetime(2021, 7, 21, 18, 49)
+        )
+
+    def test_registry_decoders(self):
+        registry = app_asdu.AppAsduRegistry
+        self.assertEqual(len(registry.decoders), 256)
+        content = registry.decode_asdu(
+            app_asdu.C_AC_NA_2.type, bytearray.fromhex("07 00 00 00"), 1
+        )
+        self.assertIsInstance(content, app_asdu.C_AC_NA_2)
+        self.assertEqual(content.clave, 7)
+        with self.assertRaises(KeyError):
+            registry.decode_asdu(0xFE, bytearray(), 0)
+
+        registry.register_decoder(0xFE, lambda data, cualificador_ev: data)
+        try:
+            self.assertEqual(registry.decode_asdu(0xFE, b'\x01', 1), b'\x01')
+        finally:
+            registry.decoders[0xFE] = None
+
+    def test_extension_object_classes(self):
+        self.assertIs(app_asdu.R_RM_R2_2.object_classes[198],
+                      app_asdu.TrafoRatio)
+        self.assertIs(app_asdu.R_IN_VA_2.object_classes[192],
+                      app_asdu.TotalizadoresInstantaneos)
+        # special days are not implemented
+        self.assertIsNone(app_asdu.R_TA_IN_2.object_classes[192])
+        c = app_asdu.R_TA_IN_2()
+        with self.assertRaises(KeyError):
+            c.from_hex(bytearray.fromhex("c0 00 00 00"), 1)
@@ -0,0 +1,84 @@
+from . import context
+import os
+import shutil
+import tempfile
+import unittest
+
+from iec870ree import archive, base_asdu, protocol
+from .frames import FIXED_FRAME, VARIABLE_FRAME
+from .test_protocol import MockPhysicalLayer
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'frames.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_frames(self):
+        with archive.ArchiveWriter(self.path) as writer:
+            for ts in range(10):
+                writer.write(FIXED_FRAME, 1, archive.DIRECTION_OUT, 1000 + ts)
+                writer.write(VARIABLE_FRAME, 1, archive.DIRECTION_IN,
+                             1000 + ts)
+                writer.write(VARIABLE_FRAME, 2, archive.DIRECTION_IN,
+                             1000 + ts)
+
+    def test_write_read(self):
+        self.write_frames()
+        with archive.ArchiveReader(self.path) as reader:
+            self.assertEqual(
+                reader.keys(),
+                [(1, archive.FIXED_FRAME_TYPE), (1, 0xB7), (2, 0xB7)]
+            )
+            records = list(reader.records(1, 0xB7, 1003, 1006))
+            self.assertEqual([r.timestamp for r in records],
+                             [1003, 1004, 1005])
+            for record in records:
+                self.assertEqual(record.meter, 1)
+                self.assertEqual(record.direction, archive.DIRECTION_IN)
+                self.assertEqual(bytearray(record.frame), VARIABLE_FRAME)
+
+            frames = list(reader.frames(1, archive.FIXED_FRAME_TYPE))
+            self.assertEqual(len(frames), 10)
+            self.assertIsInstance(frames[0], base_asdu.FixedAsdu)
+
+            frames = list(reader.frames(2, 0xB7, start=1008))
+            self.assertEqual(len(frames), 2)
+            self.assertEqual(frames[0].content.clave, 7)
+
+            self.assertEqual(len(list(reader.scan())), 30)
+
+    def test_append_and_rebuild_index(self):
+        self.write_frames()
+        self.write_frames()
+        with archive.ArchiveReader(self.path) as reader:
+            self.assertEqual(len(list(reader.records(2, 0xB7))), 20)
+            offsets = [r.offset for r in reader.records(1, 0xB7)]
+
+        os.remove(self.path + archive.INDEX_SUFFIX)
+        with archive.ArchiveReader(self.path) as reader:
+            self.assertEqual(
+                [r.offset for r in reader.records(1, 0xB7)], offsets
+            )
+
+    def test_link_layer_archive(self):
+        physical_layer = MockPhysicalLayer()
+        writer = archive.ArchiveWriter(self.path)
+        link_layer = protocol.LinkLayer(der=1, archive=writer)
+        link_layer.initialize(physical_layer)
+        physical_layer.to_receive = bytearray.fromhex("10 0b 95 d1 71 16")
+        link_layer.link_state_request()
+        writer.close()
+
+        with archive.ArchiveReader(self.path) as reader:
+            records = list(reader.scan())
+        self.assertEqual(
+            [r.direction for r in records],
+            [archive.DIRECTION_OUT, archive.DIRECTION_IN]
+        )
+        self.assertEqual(bytearray(records[1].frame),
+                         physical_layer.to_receive)
@@ -0,0 +1,96 @@
+from . import context
+import socket
+import sys
+import threading
+import unittest
+
+if sys.version_info < (3, 5):
+    raise unittest.SkipTest("asyncio streams need Python 3.5")
+
+import asyncio
+from iec870ree.async_ip import AsyncIp
+from iec870ree.base_asdu import FixedAsdu, VariableAsdu
+from iec870ree.protocol import ProtocolException
+from .frames import FIXED_FRAME, VARIABLE_FRAME
+
+
+class MeterServer(object):
+    """Answers each request with a variable frame split in two writes and
+    a fixed frame, then closes the connection"""
+
+    def __init__(self, connections=1):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(connections)
+        self.addr = self.sock.getsockname()
+        self.received = []
+        self.thread = threading.Thread(target=self.serve, args=(connections,))
+        self.thread.start()
+
+    def serve(self, connections):
+        clients = [self.sock.accept()[0] for _ in range(connections)]
+        for client in clients:
+            self.received.append(client.recv(1024))
+            client.sendall(VARIABLE_FRAME[:5])
+            client.sendall(VARIABLE_FRAME[5:] + FIXED_FRAME)
+            client.close()
+        self.sock.close()
+
+
+class TestAsyncIp(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def test_initial_values(self):
+        ip = AsyncIp(('localhost', 20000))
+        self.assertEqual(ip.addr, ('localhost', 20000))
+        self.assertIsNone(ip.writer)
+        self.assertFalse(ip.connected)
+
+    def test_read_frames(self):
+        server = MeterServer()
+        ip = AsyncIp(server.addr, waiting=0)
+        run = self.loop.run_until_complete
+        run(ip.connect())
+        self.assertTrue(ip.connected)
+        run(ip.send_bytes(FIXED_FRAME))
+        frame = run(ip.read_frame(5))
+        self.assertIsInstance(frame, VariableAsdu)
+        self.assertEqual(frame.buffer, VARIABLE_FRAME)
+        frame = run(ip.read_frame(5))
+        self.assertIsInstance(frame, FixedAsdu)
+        with self.assertRaises(ProtocolException):
+            run(ip.read_frame(5))
+        run(ip.disconnect())
+        server.thread.join(5)
+        self.assertEqual(server.received, [bytes(FIXED_FRAME)])
+
+    def test_many_connections(self):
+        server = MeterServer(connections=3)
+        ips = [AsyncIp(server.addr, waiting=0) for _ in range(3)]
+        run = self.loop.run_until_complete
+        run(asyncio.gather(*[ip.connect() for ip in ips]))
+        run(asyncio.gather(*[ip.send_bytes(FIXED_FRAME) for ip in ips]))
+        frames = run(asyncio.gather(*[ip.read_frame(5) for ip in ips]))
+        self.assertEqual([frame.buffer for frame in frames],
+                         [VARIABLE_FRAME] * 3)
+        run(asyncio.gather(*[ip.disconnect() for ip in ips]))
+        server.thread.join(5)
+
+    def test_read_timeout(self):
+        server = MeterServer()
+        ip = AsyncIp(server.addr, waiting=0)
+        run = self.loop.run_until_complete
+        run(ip.connect())
+        with self.assertRaises(asyncio.TimeoutError):
+            run(ip.read_frame(0.05))
+        run(ip.send_bytes(FIXED_FRAME))
+        run(ip.read_frame(5))
+        run(ip.disconnect())
+        server.thread.join(5)
@@ -0,0 +1,129 @@
+from . import context
+import datetime
+import sys
+import unittest
+
+if sys.version_info < (3, 6):
+    raise unittest.SkipTest("async generators need Python 3.6")
+
+import asyncio
+from iec870ree import app_asdu, base_asdu, protocol
+from iec870ree.async_protocol import AsyncAppLayer, AsyncLinkLayer
+from .async_mocks import MockAsyncPhysicalLayer
+from .frames import variable_frame
+
+ACK = bytearray.fromhex("10 00 95 d1 66 16")
+AUTHENTICATION_CONFIRMED = bytearray.fromhex(
+    "68 0d 0d 68 08 95 d1 b7 01 07 01 00 00 01 00 00 00 2f 16"
+)
+
+
+def meter_frame(tipo, causa_tm, data):
+    return variable_frame(tipo, data, der=53653, causa_tm=causa_tm,
+                          dir_registro=11)
+
+
+class TestAsyncLayers(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def create_layers(self, to_receive):
+        physical_layer = MockAsyncPhysicalLayer(to_receive)
+        link_layer = AsyncLinkLayer(der=53653, dir_pm=1)
+        link_layer.initialize(physical_layer)
+        app_layer = AsyncAppLayer()
+        app_layer.initialize(link_layer)
+        return physical_layer, app_layer
+
+    def collect(self, responses):
+        result = []
+        while True:
+            try:
+                result.append(
+                    self.loop.run_until_complete(responses.__anext__())
+                )
+            except StopAsyncIteration:
+                return result
+
+    def test_authenticate(self):
+        physical_layer, app_layer = self.create_layers(
+            [ACK, AUTHENTICATION_CONFIRMED]
+        )
+        resp = self.loop.run_until_complete(app_layer.authenticate(1))
+        self.assertIsInstance(resp, base_asdu.VariableAsdu)
+        self.assertEqual(resp.causa_tm, 7)
+        self.assertEqual(resp.content.clave, 1)
+        request, class2 = physical_layer.sent
+        self.assertEqual(request[7], app_asdu.C_AC_NA_2.type)
+        self.assertEqual(
+            class2,
+            app_layer.link_layer.create_class2_request_asdu(0).buffer
+        )
+
+    def test_read_incremental_values(self):
+        totals = bytearray.fromhex("01 64 00 00 00 00" "00 81 e1 07 12")
+        confirmation = meter_frame(app_asdu.C_CI_NU_2.type, 7, bytearray(11))
+        terminated = meter_frame(app_asdu.C_CI_NU_2.type, 0x0A,
+                                 bytearray(11))
+        # the second batch starts in the chunk of the first one
+        batch = meter_frame(app_asdu.M_IT_TK_2.type, 5, totals)
+        physical_layer, app_layer = self.create_layers([
+            ACK, confirmation, batch + batch[:4], batch[4:], terminated
+        ])
+        responses = app_layer.read_incremental_values(
+            datetime.datetime(2018, 7, 1, 1), datetime.datetime(2018, 7, 1, 2)
+        )
+        resps = self.collect(responses)
+        self.assertEqual(len(resps), 2)
+        self.assertEqual(resps[0].content.valores[0].total, 100)
+        self.assertEqual(
+            [sent[4 if sent[0] == 0x68 else 1] & base_asdu.FCB_MASK
+             for sent in physical_layer.sent],
+            [0x20, 0, 0x20, 0, 0x20]
+        )
+        self.assertEqual(len(physical_layer.sent), 5)
+
+    def test_error_cause(self):
+        physical_layer, app_layer = self.create_layers([
+            ACK, meter_frame(app_asdu.C_TI_NA_2.type, 0x0E, bytearray())
+        ])
+        with self.assertRaises(protocol.RequestedASDUTypeNotAvailable):
+            self.loop.run_until_complete(app_layer.read_datetime())
+
+    def test_wait_ready(self):
+        physical_layer, app_layer = self.create_layers([ACK])
+        resp = self.loop.run_until_complete(
+            app_layer.link_layer.wait_ready(max_wait=1)
+        )
+        self.assertEqual(resp.buffer, ACK)
+        self.assertEqual(
+            physical_layer.sent,
+            [app_layer.link_layer.create_link_state_asdu().buffer]
+        )
+
+    def test_wait_ready_late_answers(self):
+        link_state = bytearray.fromhex("10 0b 95 d1 71 16")
+        # the first request is answered after its timeout
+        physical_layer, app_layer = self.create_layers([
+            asyncio.TimeoutError(), link_state, link_state, ACK
+        ])
+        link_layer = app_layer.link_layer
+        resp = self.loop.run_until_complete(
+            link_layer.wait_ready(max_wait=1, first_timeout=0.01)
+        )
+        self.assertEqual(resp.buffer, link_state)
+        self.assertEqual(len(physical_layer.sent), 2)
+        self.assertEqual(link_layer.late_link_states, 1)
+        reposition = link_layer.create_remote_link_reposition_asdu()
+        self.loop.run_until_complete(link_layer.send_frame(reposition))
+        resp = self.loop.run_until_complete(link_layer.get_frame(1))
+        self.assertEqual(resp.buffer, ACK)
+
+    def test_connection_closed(self):
+        physical_layer, app_layer = self.create_layers([ACK])
+        with self.assertRaises(protocol.ProtocolException):
+            self.loop.run_until_complete(app_layer.get_info())
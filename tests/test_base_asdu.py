@@ -24,6 +24,93 @@ class TestASDUParser(unittest.TestCase):
         self.assertIsInstance(asdu, iec870ree.base_asdu.VariableAsdu)
         asdurepresentation = str(asdu)
 
+    def test_feed_several_asdus(self):
+        chunk = bytearray.fromhex(
+            "10 00 0c 87 93 16"
+            "ff ff"
+            "68 0D 0D 68 73 0C 87 B7 01 06 01 00 00 07 00 00 00 CC 16"
+            "10 49 0c 87 DC 16"
+        )
+        parser = iec870ree.base_asdu.AsduParser()
+        asdus = parser.feed(chunk)
+        self.assertEqual(len(asdus), 3)
+        self.assertIsInstance(asdus[0], iec870ree.base_asdu.FixedAsdu)
+        self.assertIsInstance(asdus[1], iec870ree.base_asdu.VariableAsdu)
+        self.assertIsInstance(asdus[2], iec870ree.base_asdu.FixedAsdu)
+        self.assertEqual(asdus[1].content.clave, 7)
+        self.assertEqual(asdus[2].der, 34572)
+        self.assertIsNone(parser.asdu)
+
+    def test_feed_split_asdu(self):
+        var_asdu = bytearray.fromhex(
+            "68 0D 0D 68 73 0C 87 B7 01 06 01 00 00 07 00 00 00 CC 16"
+        )
+        for split in range(1, len(var_asdu)):
+            parser = iec870ree.base_asdu.AsduParser()
+            self.assertEqual(parser.feed(memoryview(var_asdu)[:split]), [])
+            asdus = parser.feed(memoryview(var_asdu)[split:])
+            self.assertEqual(len(asdus), 1)
+            self.assertEqual(asdus[0].buffer, var_asdu)
+
+    def test_variable_asdu_lazy_content(self):
+        # ASDU type 0xFE is not registered, only decoding it fails
+        var_asdu = bytearray.fromhex(
+            "68 0D 0D 68 73 0C 87 FE 01 06 01 00 00 07 00 00 00 13 16"
+        )
+        parser = iec870ree.base_asdu.AsduParser()
+        asdu = parser.feed(var_asdu)[0]
+        self.assertEqual(asdu.tipo, 0xFE)
+        self.assertEqual(asdu.data, bytearray.fromhex("07 00 00 00"))
+        with self.assertRaises(KeyError):
+            asdu.content
+
+        var_asdu = bytearray.fromhex(
+            "68 0D 0D 68 73 0C 87 B7 01 06 01 00 00 07 00 00 00 CC 16"
+        )
+        asdu = parser.feed(var_asdu)[0]
+        content = asdu.content
+        self.assertEqual(content.clave, 7)
+        self.assertIs(asdu.content, content)
+
+    def test_wrong_asdu_raises(self):
+        parser = iec870ree.base_asdu.AsduParser()
+        with self.assertRaises(iec870ree.base_asdu.ParserException):
+            parser.feed(bytearray.fromhex("01"))
+
+        parser = iec870ree.base_asdu.AsduParser()
+        with self.assertRaises(iec870ree.base_asdu.ParserException):
+            parser.feed(bytearray.fromhex("10 49 0c 87 DD 16"))
+
+        parser = iec870ree.base_asdu.AsduParser()
+        with self.assertRaises(iec870ree.base_asdu.ParserException):
+            parser.feed(bytearray.fromhex("68 0D 0C 68"))
+
+    def test_resync_after_wrong_bytes(self):
+        chunk = bytearray.fromhex(
+            "01 02"
+            # wrong checksum
+            "10 49 0c 87 DD 16"
+            "68 0D 0D 68 73 0C 87 B7 01 06 01 00 00 07 00 00 00 CC 16"
+            # wrong header
+            "68 0D 0C 68"
+            "10 49 0c 87 DC 16"
+        )
+        parser = iec870ree.base_asdu.AsduParser(resync=True)
+        asdus = parser.feed(chunk[:5]) + parser.feed(chunk[5:])
+        self.assertEqual(len(asdus), 2)
+        self.assertIsInstance(asdus[0], iec870ree.base_asdu.VariableAsdu)
+        self.assertEqual(asdus[0].content.clave, 7)
+        self.assertIsInstance(asdus[1], iec870ree.base_asdu.FixedAsdu)
+        self.assertEqual(parser.discarded_frames, 3)
+        self.assertEqual(parser.discarded_bytes, 12)
+
+        parser = iec870ree.base_asdu.AsduParser(resync=True)
+        asdus = [parser.append_and_get_if_completed(b) for b in chunk]
+        asdus = [asdu for asdu in asdus if asdu is not None]
+        self.assertEqual(len(asdus), 2)
+        self.assertEqual(parser.discarded_frames, 3)
+        self.assertEqual(parser.discarded_bytes, 12)
+
 class TestFixedAsdu(unittest.TestCase):
     
     def test_create_asdu1(self):
@@ -54,7 +141,36 @@ class TestFixedAsdu(unittest.TestCase):
         fixed_asdu = bytearray.fromhex("10 49 0c 87 DC 16")
         self.assertEqual(asdu.buffer, fixed_asdu)
 
+    def test_campo_c_bits(self):
+        c = iec870ree.base_asdu.Flags_CampoC(0x73)
+        self.assertEqual((c.res, c.prm, c.fcb, c.fcv, c.cf), (0, 1, 1, 1, 3))
+        c.fcb = 0
+        c.cf = 0x1b
+        self.assertEqual(c.asByte, 0x5b)
+        c.res = 1
+        self.assertEqual(c.asByte, 0xdb)
+        with self.assertRaises(AttributeError):
+            c.other = 1
+
 class TestVariableAsdu(unittest.TestCase):
+    def test_parse_data_is_buffer_view(self):
+        var_asdu = bytearray.fromhex(
+            "68 0D 0D 68 73 0C 87 B7 01 06 01 00 00 07 00 00 00 CC 16"
+        )
+        parser = iec870ree.base_asdu.AsduParser()
+        asdu = parser.feed(var_asdu)[0]
+        self.assertIsInstance(asdu.data, memoryview)
+        self.assertEqual(bytearray(asdu.data), bytearray.fromhex("07 00 00 00"))
+        # the data is not copied, it changes with the buffer
+        asdu.buffer[13] = 8
+        self.assertEqual(bytearray(asdu.data), bytearray.fromhex("08 00 00 00"))
+        asdu.buffer[13] = 7
+        self.assertIn("CONTENIDO: 07:00:00:00", repr(asdu))
+        self.assertEqual(asdu.der, 34572)
+        self.assertEqual(asdu.dir_pm, 1)
+        asdu.generate()
+        self.assertEqual(asdu.buffer, var_asdu)
+
     def test_generate_variable(self):
         asdu = iec870ree.base_asdu.VariableAsdu()
         asdu.c.res = 0
@@ -0,0 +1,94 @@
+from . import context
+import binascii
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import iec870ree.capture
+from iec870ree.base_asdu import FixedAsdu, VariableAsdu
+from .frames import FIXED_FRAME, VARIABLE_FRAME
+
+
+class TestCapture(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, data):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'wb') as capture:
+            capture.write(data)
+        return path
+
+    def check_frames(self, frames, count):
+        self.assertEqual(len(frames), count * 2)
+        for fixed, variable in zip(frames[::2], frames[1::2]):
+            self.assertIsInstance(fixed, FixedAsdu)
+            self.assertEqual(fixed.der, 34572)
+            self.assertIsInstance(variable, VariableAsdu)
+            self.assertEqual(variable.buffer, VARIABLE_FRAME)
+            self.assertEqual(variable.content.clave, 7)
+
+    def test_frame_boundaries(self):
+        data = bytes((FIXED_FRAME + VARIABLE_FRAME) * 10)
+        ranges = iec870ree.capture.frame_boundaries(data, 30)
+        self.assertEqual(ranges[0], (0, 31))
+        self.assertEqual(ranges[-1][1], len(data))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertIn(data[start:start + 1], (b'\x10', b'\x68'))
+
+    def test_frame_boundaries_junk(self):
+        # stray init bytes must not move a boundary inside a frame
+        rand = random.Random(1)
+        data = bytearray()
+        for _ in range(3000):
+            data += FIXED_FRAME
+            if rand.random() < 0.05:
+                data.append(rand.choice((0x10, 0x68, 0x01)))
+            data += VARIABLE_FRAME
+        data = bytes(data)
+        for chunk_size in (512, len(data)):
+            frames = []
+            for start, end in iec870ree.capture.frame_boundaries(
+                    data, chunk_size):
+                frames.extend(iec870ree.capture.decode_chunk(
+                    data[start:end], decode=False
+                ))
+            self.assertEqual(len(frames), 6000)
+
+    def test_read_raw_capture(self):
+        path = self.write('capture.bin',
+                          bytes((FIXED_FRAME + VARIABLE_FRAME) * 50))
+        for processes in (1, 2):
+            frames = list(iec870ree.capture.read_capture(
+                path, processes=processes, chunk_size=100
+            ))
+            self.check_frames(frames, 50)
+
+    def test_read_raw_capture_resync(self):
+        data = (FIXED_FRAME + b'\xff\xff' + VARIABLE_FRAME) * 20
+        path = self.write('capture.bin', bytes(data))
+        frames = list(iec870ree.capture.read_capture(
+            path, processes=2, chunk_size=64
+        ))
+        self.check_frames(frames, 20)
+
+    def test_read_hex_capture(self):
+        line = (binascii.hexlify(FIXED_FRAME) + b' '
+                + binascii.hexlify(VARIABLE_FRAME))
+        path = self.write('capture.txt', b'\n'.join([line] * 40) + b'\n')
+        for processes in (1, 2):
+            frames = list(iec870ree.capture.read_capture(
+                path, is_hex=True, processes=processes, chunk_size=200
+            ))
+            self.check_frames(frames, 40)
+
+    def test_read_empty_capture(self):
+        path = self.write('capture.bin', b'')
+        self.assertEqual(list(iec870ree.capture.read_capture(path)), [])
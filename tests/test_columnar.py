@@ -0,0 +1,47 @@
+from . import context
+import calendar
+import unittest
+
+from iec870ree import app_asdu, columnar
+from .frames import parse_frame, variable_frame
+
+
+M_IT_TK_2_DATA = bytearray.fromhex(
+    "01 04 00 00 00 00 02 00 00 00 00 00 03 1b 00 00 00 00"
+    "04 00 00 00 00 00 05 00 00 00 00 00 06 00 00 00 00 00"
+    "07 00 00 00 00 80 08 00 00 00 00 80 00 81 e1 07 12"
+)
+
+
+class TestIntegratedTotalsColumns(unittest.TestCase):
+
+    def test_append_asdu(self):
+        frame = parse_frame(variable_frame(
+            app_asdu.M_IT_TK_2.type, M_IT_TK_2_DATA, causa_tm=5,
+            cualificador_ev=8
+        ))
+        columns = columnar.IntegratedTotalsColumns()
+        columns.extend([frame, frame])
+        self.assertEqual(len(columns), 16)
+
+        valores = frame.content.valores * 2
+        self.assertEqual(list(columns.address), [v.address for v in valores])
+        self.assertEqual(list(columns.total), [v.total for v in valores])
+        self.assertEqual(list(columns.quality), [v.quality for v in valores])
+        self.assertEqual(
+            list(columns.epoch),
+            [calendar.timegm(v.datetime.utctimetuple()) for v in valores]
+        )
+
+    def test_to_numpy(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("numpy not installed")
+        frame = parse_frame(variable_frame(
+            app_asdu.M_IT_TK_2.type, M_IT_TK_2_DATA, causa_tm=5,
+            cualificador_ev=8
+        ))
+        arrays = columnar.IntegratedTotalsColumns().extend([frame]).to_numpy()
+        self.assertEqual(arrays['total'].tolist()[:3], [4, 0, 27])
+        self.assertEqual(int(arrays['epoch'][0]), 1530399600)
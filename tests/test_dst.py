@@ -0,0 +1,109 @@
+from . import context
+import calendar
+import datetime
+import unittest
+
+import pytz
+from iec870ree import app_asdu, dst
+
+
+class OpaqueTimezone(datetime.tzinfo):
+    """pytz timezone without the internals DstTable reads"""
+
+    def __init__(self, tz):
+        self.pytz_tz = tz
+
+    def localize(self, dt, is_dst=False):
+        return self.pytz_tz.localize(dt, is_dst=is_dst)
+
+    def utcoffset(self, dt):
+        return self.pytz_tz.utcoffset(dt)
+
+    def dst(self, dt):
+        return self.pytz_tz.dst(dt)
+
+    def fromutc(self, dt):
+        return self.pytz_tz.fromutc(dt.replace(tzinfo=None))
+
+
+class TestDstTable(unittest.TestCase):
+
+    def assertSameLocalize(self, tz, start, end, step):
+        table = dst.DstTable(tz)
+        dt = start
+        while dt < end:
+            for is_dst in (False, True):
+                expected = tz.localize(dt, is_dst=is_dst)
+                result = table.localize(dt, is_dst=is_dst)
+                self.assertEqual(result, expected)
+                self.assertIs(result.tzinfo, expected.tzinfo)
+                self.assertEqual(
+                    table.to_epoch(dt, is_dst),
+                    calendar.timegm(expected.utctimetuple())
+                )
+            dt += step
+
+    def test_localize_as_pytz(self):
+        self.assertSameLocalize(
+            pytz.timezone('Europe/Madrid'), datetime.datetime(2019, 1, 1),
+            datetime.datetime(2020, 1, 1), datetime.timedelta(minutes=97)
+        )
+        self.assertSameLocalize(
+            pytz.timezone('Atlantic/Canary'), datetime.datetime(1970, 1, 1),
+            datetime.datetime(2040, 1, 1), datetime.timedelta(minutes=4957)
+        )
+        self.assertSameLocalize(
+            pytz.utc, datetime.datetime(2019, 1, 1),
+            datetime.datetime(2019, 1, 2), datetime.timedelta(minutes=15)
+        )
+
+    def test_gap_and_fold(self):
+        table = dst.get_table('Europe/Madrid')
+        # 2019-03-31 02:00 CET -> 03:00 CEST
+        gap = datetime.datetime(2019, 3, 31, 2, 30)
+        self.assertEqual(table.to_epoch(gap, False), 1553995800)
+        self.assertEqual(table.to_epoch(gap, True), 1553992200)
+        # 2019-10-27 03:00 CEST -> 02:00 CET
+        fold = datetime.datetime(2019, 10, 27, 2, 30)
+        summer = table.localize(fold, is_dst=True)
+        winter = table.localize(fold, is_dst=False)
+        self.assertEqual(summer.utcoffset(), datetime.timedelta(hours=2))
+        self.assertEqual(winter.utcoffset(), datetime.timedelta(hours=1))
+        self.assertTrue(table.is_dst(table.to_epoch(fold, True)))
+        self.assertFalse(table.is_dst(table.to_epoch(fold, False)))
+
+    def test_from_epoch(self):
+        tz = pytz.timezone('Europe/Madrid')
+        table = dst.get_table(tz)
+        self.assertIs(table, dst.get_table('Europe/Madrid'))
+        for epoch in range(1553990400, 1554012000, 900):
+            expected = datetime.datetime.fromtimestamp(epoch, tz)
+            result = table.from_epoch(epoch)
+            self.assertEqual(result.replace(tzinfo=None),
+                             expected.replace(tzinfo=None))
+            self.assertIs(result.tzinfo, expected.tzinfo)
+
+    def test_aware_datetime_raises(self):
+        table = dst.get_table('Europe/Madrid')
+        aware = pytz.utc.localize(datetime.datetime(2019, 7, 1, 10))
+        with self.assertRaises(ValueError):
+            table.localize(aware)
+        with self.assertRaises(ValueError):
+            table.to_epoch(aware)
+        with self.assertRaises(ValueError):
+            app_asdu.C_SP_NB_2(aware, aware)
+
+    def test_no_transition_table(self):
+        tz = pytz.timezone('Europe/Madrid')
+        opaque = OpaqueTimezone(tz)
+        table = dst.DstTable(opaque)
+        self.assertIsNone(table.transitions)
+        self.assertSameLocalize(
+            opaque, datetime.datetime(2019, 3, 30),
+            datetime.datetime(2019, 4, 1), datetime.timedelta(minutes=30)
+        )
+        fold = datetime.datetime(2019, 10, 27, 2, 30)
+        self.assertTrue(table.is_dst(table.to_epoch(fold, True)))
+        self.assertFalse(table.is_dst(table.to_epoch(fold, False)))
+        self.assertEqual(table.from_epoch(1553995800),
+                         dst.get_table(tz).from_epoch(1553995800))
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from . import context
+import unittest
+
+from iec870ree import events
+from iec870ree.app_asdu import EventRecord
+
+
+class TestEvents(unittest.TestCase):
+
+    def test_classify_event(self):
+        info = events.classify_event(3, 1, 1)
+        self.assertEqual(info.description,
+                         'Inicio fallo de tensión de medida en fase 1')
+        self.assertEqual(info.register, '52')
+        self.assertIs(info, events.classify_event(3, 1, 1))
+        self.assertEqual(events.classify_event(3, 1, 0).description,
+                         'Fin fallo de tensión de medida en fase 1')
+        self.assertEqual(events.classify_event(7, 21, 0).register, '131')
+
+    def test_unknown_events(self):
+        self.assertIs(events.classify_event(3, 100, 0),
+                      events.UNKNOWN_SPQ_EVENT)
+        self.assertIs(events.classify_event(250, 1, 0),
+                      events.UNKNOWN_SPA_EVENT)
+
+    def test_get_event_description(self):
+        self.assertEqual(
+            events.get_event_description(EventRecord(7, 9, 0, 0)),
+            'cambio de hora, hora anterior'
+        )
@@ -5,8 +5,25 @@ if PY2:
 else:
     from unittest.mock import patch, Mock, MagicMock
 import logging
+import socket
+import time
 
 from iec870ree.ip import Ip
+from iec870ree import ip as ip_module
+
+
+def recv_into_chunks(chunks):
+    """side_effect for a mocked socket recv_into returning the chunks, and
+    then nothing as a closed connection"""
+    chunks = list(chunks)
+
+    def recv_into(buffer):
+        if not chunks:
+            return 0
+        chunk = chunks.pop(0)
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+    return recv_into
 
 
 class TestIp(unittest.TestCase):
@@ -24,7 +41,7 @@ class TestIp(unittest.TestCase):
     @patch('socket.create_connection')
     def test_connected(self, mock_socket):
         m_socket = MagicMock()
-        m_socket.recv.return_value = bytes([1,2])
+        m_socket.recv_into.side_effect = recv_into_chunks([bytes([1, 2])])
         mock_socket.return_value = m_socket
         ip = Ip(('example.org', 20000))
         ip.connect()
@@ -35,16 +52,80 @@ class TestIp(unittest.TestCase):
     @patch('socket.create_connection')
     def test_read_from_queue(self, mock_socket):
         m_socket = MagicMock()
-        m_socket.recv = Mock()
-        m_socket.recv.side_effect = [
+        m_socket.recv_into = Mock()
+        m_socket.recv_into.side_effect = recv_into_chunks([
             bytearray([1, 2]),
             bytearray([3, 4]),
             bytearray([5, 6])
-        ]
+        ])
         mock_socket.return_value = m_socket
         ip = Ip(('example.org', 20000))
         ip.connect()
         self.assertTrue(ip.connected)
         self.assertIsInstance(ip.connection, MagicMock)
         self.assertEqual(ip.get_byte(), 1)
-        ip.disconnect()
\ No newline at end of file
+        ip.disconnect()
+
+    @patch('socket.create_connection')
+    def test_read_chunks(self, mock_socket):
+        m_socket = MagicMock()
+        m_socket.recv_into.side_effect = recv_into_chunks([
+            bytearray([1, 2, 3]),
+            bytearray([4, 5]),
+        ])
+        mock_socket.return_value = m_socket
+        ip = Ip(('example.org', 20000), waiting=0)
+        ip.connect()
+        self.assertEqual(ip.get_bytes(2), bytearray([1, 2]))
+        ip.thread.join(1)
+        self.assertEqual(ip.read_available(), bytearray([3, 4, 5]))
+        self.assertIsNone(ip.read_available())
+        self.assertIsNone(ip.get_byte())
+        ip.disconnect()
+
+    def test_ring_buffer(self):
+        ip = Ip(('example.org', 20000))
+        ip.buffer = bytearray(4)
+        receive = recv_into_chunks([
+            bytearray([1, 2, 3]), bytearray([4]), bytearray([5, 6]),
+            bytearray([7, 8, 9, 10]),
+        ])
+
+        def received():
+            ip.count += receive(ip.free_space())
+
+        received()
+        self.assertEqual(ip.get_bytes(2, 0), bytearray([1, 2]))
+        received()
+        received()
+        # 5, 6 wrapped around the end of the buffer
+        self.assertEqual((ip.head, ip.count), (2, 4))
+        self.assertEqual(len(ip.free_space()), 4)
+        received()
+        self.assertEqual(len(ip.buffer), 8)
+        self.assertEqual(ip.read_available(0), bytearray(range(3, 11)))
+        with self.assertRaises(ip_module.queue.Empty):
+            ip.read_available(0.01)
+
+    @patch('socket.create_connection')
+    def test_quiet_period(self, mock_socket):
+        chunks = [b'CONNECT 9600\r\n', b'\r\n']
+
+        def recv_into(buffer):
+            if chunks:
+                chunk = chunks.pop(0)
+                buffer[:len(chunk)] = chunk
+                return len(chunk)
+            time.sleep(0.01)
+            raise socket.timeout()
+
+        m_socket = MagicMock()
+        m_socket.recv_into.side_effect = recv_into
+        mock_socket.return_value = m_socket
+        ip = Ip(('example.org', 20000), waiting=5, quiet_period=0.1)
+        start = time.time()
+        ip.connect()
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(ip.count, 0)
+        self.assertFalse(chunks)
+        ip.disconnect()
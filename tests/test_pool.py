@@ -0,0 +1,156 @@
+from . import context
+import datetime
+import unittest
+from six.moves import queue
+
+from iec870ree import app_asdu, protocol
+from iec870ree.pool import SessionPool
+from .frames import variable_frame
+
+
+LINK_STATE = bytearray.fromhex("10 0b 01 00 0c 16")
+ACK = bytearray.fromhex("10 00 01 00 01 16")
+# link state, remote link reposition and authentication
+OPEN_FRAMES = [
+    LINK_STATE, ACK, ACK, variable_frame(183, bytearray.fromhex("07 00 00 00"))
+]
+FINISH_FRAMES = [ACK, variable_frame(187, bytearray())]
+
+
+class ScriptedPhysicalLayer(protocol.PhysicalLayer):
+
+    def __init__(self, to_receive):
+        self.to_receive = list(to_receive)
+        self.sent = []
+        self.connected = False
+        self.closed = False
+
+    def connect(self):
+        self.connected = True
+
+    def disconnect(self):
+        self.connected = False
+
+    def send_byte(self, byte):
+        self.send_bytes(bytearray((byte, )))
+
+    def send_bytes(self, bts):
+        self.sent.append(bytearray(bts))
+
+    def get_byte(self, timeout):
+        raise NotImplementedError
+
+    def read_available(self, timeout):
+        if not self.to_receive:
+            raise queue.Empty
+        return self.to_receive.pop(0)
+
+
+class MockSessionPool(SessionPool):
+
+    def __init__(self, *args, **kwargs):
+        super(MockSessionPool, self).__init__(*args, **kwargs)
+        self.physical_layers = []
+        # answers to the reads of the test
+        self.read_frames = []
+
+    def create_physical_layer(self, host, port):
+        physical_layer = ScriptedPhysicalLayer(
+            OPEN_FRAMES + self.read_frames + FINISH_FRAMES
+        )
+        self.physical_layers.append(physical_layer)
+        return physical_layer
+
+
+class TestSessionPool(unittest.TestCase):
+
+    def test_reuse_session(self):
+        pool = MockSessionPool()
+        with pool.session('example.org', 20000, 1, 1, 7) as app_layer:
+            physical_layer, = pool.physical_layers
+            self.assertEqual(len(physical_layer.sent), 4)
+            heartbeat = datetime.datetime(2000, 1, 1)
+            app_layer.last_content_heartbeat = heartbeat
+        with pool.session('example.org', 20000, 1, 1, 7) as reused:
+            self.assertIs(reused, app_layer)
+            self.assertGreater(app_layer.last_content_heartbeat, heartbeat)
+        self.assertEqual(len(pool.physical_layers), 1)
+        self.assertEqual(len(physical_layer.sent), 4)
+
+        with pool.session('example.org', 20000, 1, 1, 8) as other:
+            self.assertIsNot(other, app_layer)
+        self.assertEqual(len(pool.physical_layers), 2)
+
+        pool.close()
+        for physical_layer in pool.physical_layers:
+            self.assertFalse(physical_layer.connected)
+            # finish session and class 2 request
+            self.assertEqual(len(physical_layer.sent), 6)
+            self.assertEqual(physical_layer.sent[4][7], 187)
+        self.assertEqual(pool.idle, {})
+
+    def test_expired_session(self):
+        pool = MockSessionPool(content_timeout=60)
+        session = pool.acquire('example.org', 20000, 1, 1, 7)
+        pool.release(session)
+        session.released -= 61
+        new_session = pool.acquire('example.org', 20000, 1, 1, 7)
+        self.assertIsNot(new_session, session)
+        self.assertEqual(new_session.app_layer.max_content_timeout, 60)
+        pool.close()
+        self.assertTrue(session.closed)
+        # the meter may have ended it, it is disconnected without finishing
+        self.assertEqual(len(session.physical_layer.sent), 4)
+
+    def test_discard_on_error(self):
+        pool = MockSessionPool()
+        with self.assertRaises(ValueError):
+            with pool.session('example.org', 20000, 1, 1, 7) as app_layer:
+                raise ValueError
+        physical_layer, = pool.physical_layers
+        self.assertFalse(physical_layer.connected)
+        self.assertEqual(pool.idle, {})
+
+        session = pool.acquire('example.org', 20000, 1, 1, 7)
+        session.physical_layer.closed = True
+        pool.release(session)
+        self.assertEqual(pool.idle, {})
+
+    def test_discard_read_not_finished(self):
+        totals = bytearray.fromhex("01 64 00 00 00 00" "00 81 e1 07 12")
+        pool = MockSessionPool()
+        pool.read_frames = [
+            ACK, variable_frame(app_asdu.C_CI_NU_2.type, bytearray(11)),
+            variable_frame(app_asdu.M_IT_TK_2.type, totals, causa_tm=5)
+        ]
+        start = datetime.datetime(2018, 7, 1, 1)
+        end = datetime.datetime(2018, 7, 1, 2)
+        with pool.session('example.org', 20000, 1, 1, 7) as app_layer:
+            for resp in app_layer.read_incremental_values(start, end):
+                break
+        self.assertEqual(resp.content.valores[0].total, 100)
+        physical_layer, = pool.physical_layers
+        self.assertFalse(physical_layer.connected)
+        self.assertEqual(pool.idle, {})
+        # the pending batches would be read as the finish answers
+        self.assertNotIn(187, [sent[7] for sent in physical_layer.sent
+                               if sent[0] == 0x68])
+
+        pool.read_frames = pool.read_frames[:2] + [
+            variable_frame(app_asdu.M_IT_TK_2.type, totals, causa_tm=7)
+        ]
+        with pool.session('example.org', 20000, 1, 1, 7) as app_layer:
+            list(app_layer.read_incremental_values(start, end))
+        self.assertEqual(len(pool.idle[('example.org', 20000, 1, 1, 7)]), 1)
+
+    def test_open_fails(self):
+        class FailingPool(MockSessionPool):
+            def create_physical_layer(self, host, port):
+                physical_layer = ScriptedPhysicalLayer([LINK_STATE])
+                self.physical_layers.append(physical_layer)
+                return physical_layer
+
+        pool = FailingPool()
+        with self.assertRaises(protocol.ProtocolException):
+            pool.acquire('example.org', 20000, 1, 1, 7)
+        self.assertFalse(pool.physical_layers[0].connected)
@@ -1,6 +1,11 @@
 from . import context
 import unittest
-from iec870ree import protocol, base_asdu
+import datetime
+import logging
+import math
+import time
+from six.moves import queue
+from iec870ree import protocol, base_asdu, app_asdu
 
 class TestProtocol(unittest.TestCase):
     pass
@@ -57,6 +62,74 @@ class TestLinkLayer(unittest.TestCase):
         physical_layer.to_receive =  bytearray.fromhex("10 00 95 d1 66 16")
         link_layer.remote_link_reposition()
 
+    def test_send_frame_logging(self):
+        class UnprintableFrame(object):
+            buffer = bytearray.fromhex("10 49 0c 87 DC 16")
+
+            def __repr__(self):
+                raise AssertionError("frame formatted")
+
+        physical_layer = MockPhysicalLayer()
+        link_layer = protocol.LinkLayer(der=34572)
+        link_layer.initialize(physical_layer)
+        iec_logger = logging.getLogger('iec870ree')
+        level = iec_logger.level
+        iec_logger.setLevel(logging.WARNING)
+        try:
+            link_layer.send_frame(UnprintableFrame())
+        finally:
+            iec_logger.setLevel(level)
+
+        trace_logger = logging.getLogger('iec870ree.trace')
+        logs = LogCapture()
+        trace_logger.addHandler(logs)
+        trace_logger.setLevel(protocol.TRACE)
+        try:
+            link_layer.send_frame(link_layer.create_link_state_asdu())
+            physical_layer.to_receive = UnprintableFrame.buffer
+            link_layer.get_frame()
+        finally:
+            trace_logger.removeHandler(logs)
+            trace_logger.setLevel(logging.NOTSET)
+        self.assertEqual(
+            [record.getMessage() for record in logs.records],
+            ["->10:49:0c:87:dc:16", "<-10:49:0c:87:dc:16"]
+        )
+
+    def test_wait_ready(self):
+        physical_layer = SlowPhysicalLayer(answer_after=3)
+        link_layer = protocol.LinkLayer(der=1)
+        link_layer.initialize(physical_layer)
+        resp = link_layer.wait_ready(max_wait=5, first_timeout=0.01)
+        self.assertIsInstance(resp, base_asdu.FixedAsdu)
+        self.assertEqual(physical_layer.timeouts, [0.01, 0.02, 0.04])
+        # three requests timed out and the fourth was answered
+        self.assertEqual(len(physical_layer.sent), 4 * 6)
+
+        physical_layer = SlowPhysicalLayer(answer_after=100)
+        link_layer.initialize(physical_layer)
+        with self.assertRaises(protocol.ProtocolException):
+            link_layer.wait_ready(max_wait=0.1, first_timeout=0.01)
+        self.assertLessEqual(sum(physical_layer.timeouts), 0.2)
+
+    def test_wait_ready_late_answers(self):
+        physical_layer = LatePhysicalLayer(delay=0.15)
+        link_layer = protocol.LinkLayer(der=1)
+        link_layer.initialize(physical_layer)
+        start = time.time()
+        resp = link_layer.wait_ready(max_wait=5, first_timeout=0.1)
+        # returns with the first answer, without waiting for the second
+        self.assertLess(time.time() - start, 0.25)
+        self.assertEqual(resp.buffer, LatePhysicalLayer.LINK_STATE)
+        self.assertEqual(len(physical_layer.sent), 2 * 6)
+        self.assertEqual(link_layer.late_link_states, 1)
+        # the late answer to the second request is dropped
+        link_layer.send_frame(link_layer.create_remote_link_reposition_asdu())
+        self.assertEqual(link_layer.get_frame(1).buffer,
+                         LatePhysicalLayer.ACK)
+        self.assertEqual(link_layer.late_link_states, 0)
+        self.assertEqual(physical_layer.answers, [])
+
 class TestAppLayer(unittest.TestCase):
     def setUp(self):
         pass
@@ -78,10 +151,77 @@ class TestAppLayer(unittest.TestCase):
 
         app_layer.authenticate(3)
         pass
-    
+
+    def test_create_asdu_request_template(self):
+        link_layer = MockLinkLayer(der=34572, dir_pm=1)
+        app_layer = protocol.AppLayer()
+        app_layer.initialize(link_layer)
+        start = datetime.datetime(2018, 7, 1, 1)
+        end = datetime.datetime(2018, 8, 1)
+        requests = [
+            (app_asdu.C_AC_NA_2(7), 0),
+            (app_asdu.C_AC_NA_2(8), 0),
+            (app_asdu.C_CI_NU_2(start, end), 11),
+            (app_asdu.C_CI_NU_2(start, end), 12),
+            (app_asdu.C_SP_NB_2(start, end), 52),
+            (app_asdu.C_TA_VM_2(start, end), 134),
+            (app_asdu.C_FS_NA_2(), 0),
+        ]
+        for user_data, registro in requests * 2:
+            fcb = link_layer._fcb
+            asdu = app_layer.create_asdu_request(user_data, registro)
+
+            expected = base_asdu.VariableAsdu()
+            expected.c.prm = 1
+            expected.c.fcb = (fcb + 1) % 2
+            expected.c.fcv = 1
+            expected.c.cf = 3
+            expected.der = 34572
+            expected.cualificador_ev = (
+                0 if user_data.type == 102
+                else math.ceil(getattr(user_data, 'data_length', 6) / 6)
+            )
+            expected.causa_tm = getattr(user_data, 'causa_tm', 6)
+            expected.dir_pm = 1
+            expected.dir_registro = registro
+            expected.content = user_data
+            expected.generate()
+            self.assertEqual(asdu.buffer, expected.buffer)
+            self.assertEqual(asdu.checksum, expected.checksum)
+            self.assertEqual(asdu.c.asByte, expected.c.asByte)
+            self.assertIs(asdu.content, user_data)
+            parsed = base_asdu.AsduParser().feed(asdu.buffer)[0]
+            self.assertEqual(parsed.tipo, user_data.type)
+        self.assertEqual(len(app_layer.request_templates), 6)
+
+    def test_class2_request_asdu(self):
+        link_layer = protocol.LinkLayer(der=34572)
+        for fcb in (0, 1, 0):
+            asdu = link_layer.create_class2_request_asdu(fcb)
+            expected = base_asdu.FixedAsdu()
+            expected.c.prm = 1
+            expected.c.fcb = fcb
+            expected.c.fcv = 1
+            expected.c.cf = 11
+            expected.der = 34572
+            expected.generate()
+            self.assertEqual(asdu.buffer, expected.buffer)
+        self.assertIs(link_layer.create_class2_request_asdu(1),
+                      link_layer.create_class2_request_asdu(1))
+
+class LogCapture(logging.Handler):
+    """Keeps the emitted records, assertLogs is Python 3 only"""
+
+    def __init__(self):
+        super(LogCapture, self).__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
 class MockLinkLayer(protocol.LinkLayer):
     def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+        super(MockLinkLayer, self).__init__(*args, **kwargs)
         self.sent = []
         self.to_receive = None
         self.curr_get = -1
@@ -116,3 +256,49 @@ class MockPhysicalLayer(protocol.PhysicalLayer):
             bt = self.to_receive[self.to_receive_pos]
         self.to_receive_pos += 1
         return bt
+
+
+class SlowPhysicalLayer(MockPhysicalLayer):
+    """Answers the link state request sent after answer_after timeouts"""
+
+    def __init__(self, answer_after):
+        super(SlowPhysicalLayer, self).__init__()
+        self.answer_after = answer_after
+        self.timeouts = []
+
+    def read_available(self, timeout):
+        if len(self.timeouts) < self.answer_after:
+            self.timeouts.append(timeout)
+            time.sleep(timeout)
+            raise queue.Empty
+        return bytearray.fromhex("10 0b 01 00 0c 16")
+
+
+class LatePhysicalLayer(MockPhysicalLayer):
+    """Answers the link state requests after delay seconds and the other
+    requests at once, in the order they were sent"""
+
+    LINK_STATE = bytearray.fromhex("10 0b 01 00 0c 16")
+    ACK = bytearray.fromhex("10 00 01 00 01 16")
+
+    def __init__(self, delay):
+        super(LatePhysicalLayer, self).__init__()
+        self.delay = delay
+        # (time.time() of arrival, frame)
+        self.answers = []
+
+    def send_bytes(self, bts):
+        self.sent.extend(bts)
+        if bts[1] & 0x0f == 9:
+            self.answers.append((time.time() + self.delay, self.LINK_STATE))
+        else:
+            self.answers.append((time.time(), self.ACK))
+
+    def read_available(self, timeout):
+        now = time.time()
+        if self.answers and self.answers[0][0] <= now + timeout:
+            arrival, frame = self.answers.pop(0)
+            time.sleep(max(arrival - now, 0))
+            return frame
+        time.sleep(timeout)
+        raise queue.Empty